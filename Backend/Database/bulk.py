@@ -0,0 +1,61 @@
+# Backend/Database/bulk.py
+"""
+Set-based helpers for the roles/permissions admin API: keyset pagination
+and batch inserts of named rows. IN lists are chunked so a batch stays under
+SQLite's bound-parameter limit.
+"""
+import os
+
+from sqlalchemy import select, insert
+
+BULK_MAX_ITEMS = int(os.getenv("RBAC_BULK_MAX", "10000"))  # items per bulk request
+IN_CHUNK = 500  # values per IN (...) clause
+PAGE_DEFAULT = 100
+PAGE_MAX = 1000
+
+
+def chunked(items, size: int = IN_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def keyset_page(db, model, after: int = None, limit: int = None):
+    """
+    Rows with id > after in id order, plus the cursor for the next page
+    (None on the last page). Uses the primary key index; cost does not grow
+    with the page number the way OFFSET does.
+
+    Without `after` and `limit` every row is returned (the listings' original,
+    unpaginated behaviour); with only `after`, pages are PAGE_DEFAULT rows.
+    """
+    if after is None and limit is None:
+        return db.execute(select(model).order_by(model.id)).scalars().all(), None
+    limit = limit or PAGE_DEFAULT
+    stmt = select(model).order_by(model.id).limit(limit + 1)
+    if after is not None:
+        stmt = stmt.where(model.id > after)
+    rows = db.execute(stmt).scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+def insert_missing_names(db, model, names) -> list:
+    """
+    Inserts the names not present yet (one executemany) without committing;
+    returns the created (id, name) rows. Duplicates within `names` are ignored.
+    """
+    names = list(dict.fromkeys(names))
+    existing = set()
+    for chunk in chunked(names):
+        existing.update(db.execute(select(model.name).where(model.name.in_(chunk))).scalars())
+    missing = [n for n in names if n not in existing]
+    if not missing:
+        return []
+    db.execute(insert(model), [{"name": n} for n in missing])
+    created = []
+    for chunk in chunked(missing):
+        created.extend(db.execute(select(model.id, model.name).where(model.name.in_(chunk))).all())
+    return sorted(created)
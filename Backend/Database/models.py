@@ -1,5 +1,5 @@
 # Backend/database/models.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Table, Index
 from sqlalchemy.orm import relationship
 from .connections import Base
 
@@ -41,6 +41,22 @@ class Role(Base):
     users = relationship("User", secondary=user_role, back_populates="roles")
     permissions = relationship("Permission", secondary=role_permission, back_populates="roles")
 
+# Lookups by either side of the association tables (auth loads a user's roles on every login).
+# Declared separately so ensure_indexes() can add them to databases created before they existed.
+ASSOCIATION_INDEXES = [
+    Index("ux_user_role", user_role.c.user_id, user_role.c.role_id, unique=True),
+    Index("ix_user_role_role_id", user_role.c.role_id),
+    Index("ux_role_permission", role_permission.c.role_id, role_permission.c.permission_id, unique=True),
+    Index("ix_role_permission_permission_id", role_permission.c.permission_id),
+]
+
+
+def ensure_indexes(bind):
+    """create_all() skips indexes of tables that already exist; add any that are missing."""
+    for index in ASSOCIATION_INDEXES:
+        index.create(bind, checkfirst=True)
+
+
 class Permission(Base):
     __tablename__ = "permissions"
 
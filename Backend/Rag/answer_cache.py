@@ -0,0 +1,212 @@
+# Backend/Rag/answer_cache.py
+"""
+Semantic answer cache, partitioned by role.
+
+A new question hits the cache when its embedding is close enough (cosine
+similarity >= threshold) to a question previously answered for the SAME role.
+Entries expire after a TTL, are evicted LRU under a memory budget, and a
+role's partition is dropped as soon as ingestion bumps the corpus version of
+any label the role is granted (see vector_store.bump_corpus_versions and
+role_assigner.allowed_labels).
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from Backend.Rag.vector_store import CORPUS_VERSIONS_FILE, read_corpus_versions
+from Backend.auth.role_assigner import allowed_labels, on_grants_changed
+
+ANSWER_CACHE_ENABLED = os.getenv("RAG_ANSWER_CACHE", "true").lower() in ("1", "true", "yes")
+CACHE_THRESHOLD = float(os.getenv("RAG_CACHE_THRESHOLD", "0.95"))
+CACHE_TTL_SECONDS = float(os.getenv("RAG_CACHE_TTL", "3600"))
+CACHE_MAX_MB = float(os.getenv("RAG_CACHE_MAX_MB", "64"))
+CACHE_MAX_ENTRIES_PER_ROLE = int(os.getenv("RAG_CACHE_MAX_ENTRIES", "512"))
+
+# how often (seconds) we stat the corpus versions file
+_VERSION_CHECK_INTERVAL = 1.0
+
+
+def _normalize(vec) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+
+def _entry_size(vec, result) -> int:
+    size = vec.nbytes + len(result.get("answer", ""))
+    for d in result.get("docs", []):
+        size += len(getattr(d, "page_content", "") or "") + 256  # metadata overhead, roughly
+    return size
+
+
+class SemanticAnswerCache:
+    def __init__(
+        self,
+        threshold: float = CACHE_THRESHOLD,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        max_bytes: int = int(CACHE_MAX_MB * 1024 * 1024),
+        max_entries_per_role: int = CACHE_MAX_ENTRIES_PER_ROLE,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries_per_role = max_entries_per_role
+
+        self._lock = threading.Lock()
+        # role -> OrderedDict[entry_id -> (vec, result, created_at, size)]
+        self._partitions = {}
+        # global LRU order across roles for the memory budget: (role, entry_id)
+        self._lru = OrderedDict()
+        self._next_id = 0
+        self._bytes = 0
+
+        self._versions = read_corpus_versions()
+        self._versions_mtime = self._stat_versions()
+        self._last_version_check = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # -----------------------------
+    # corpus version tracking
+    # -----------------------------
+    @staticmethod
+    def _stat_versions():
+        try:
+            return os.stat(CORPUS_VERSIONS_FILE).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _check_versions(self):
+        now = time.monotonic()
+        if now - self._last_version_check < _VERSION_CHECK_INTERVAL:
+            return
+        self._last_version_check = now
+
+        mtime = self._stat_versions()
+        if mtime == self._versions_mtime:
+            return
+        self._versions_mtime = mtime
+
+        versions = read_corpus_versions()
+        changed = {r for r in set(versions) | set(self._versions) if versions.get(r) != self._versions.get(r)}
+        self._versions = versions
+        # versions are per chunk label; a role sees every label it is granted
+        for role in list(self._partitions):
+            if changed.intersection(allowed_labels(role)):
+                self._drop_role(role)
+
+    def _drop_role(self, role):
+        part = self._partitions.pop(role, None)
+        if not part:
+            return
+        for entry_id, (_, _, _, size) in part.items():
+            self._bytes -= size
+            self._lru.pop((role, entry_id), None)
+        self.invalidations += 1
+
+    def _remove(self, role, entry_id):
+        part = self._partitions.get(role)
+        if part is None or entry_id not in part:
+            return
+        _, _, _, size = part.pop(entry_id)
+        self._bytes -= size
+        self._lru.pop((role, entry_id), None)
+
+    # -----------------------------
+    # public API
+    # -----------------------------
+    def lookup(self, role: str, query_vec):
+        """Returns the cached result for a similar question of this role, or None."""
+        q = _normalize(query_vec)
+        with self._lock:
+            self._check_versions()
+            part = self._partitions.get(role)
+            if not part:
+                self.misses += 1
+                return None
+
+            now = time.time()
+            expired = [eid for eid, (_, _, created, _) in part.items() if now - created > self.ttl]
+            for eid in expired:
+                self._remove(role, eid)
+            if not part:
+                self.misses += 1
+                return None
+
+            ids = list(part.keys())
+            matrix = np.stack([part[eid][0] for eid in ids])
+            sims = matrix @ q
+            best = int(np.argmax(sims))
+            if float(sims[best]) < self.threshold:
+                self.misses += 1
+                return None
+
+            entry_id = ids[best]
+            part.move_to_end(entry_id)
+            self._lru.move_to_end((role, entry_id))
+            self.hits += 1
+            return part[entry_id][1]
+
+    def store(self, role: str, query_vec, result: dict):
+        vec = _normalize(query_vec)
+        size = _entry_size(vec, result)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._check_versions()
+            part = self._partitions.setdefault(role, OrderedDict())
+            entry_id = self._next_id
+            self._next_id += 1
+            part[entry_id] = (vec, result, time.time(), size)
+            self._lru[(role, entry_id)] = None
+            self._bytes += size
+
+            while len(part) > self.max_entries_per_role:
+                oldest = next(iter(part))
+                self._remove(role, oldest)
+            while self._bytes > self.max_bytes and self._lru:
+                old_role, old_id = next(iter(self._lru))
+                self._remove(old_role, old_id)
+
+    def invalidate(self, role: str = None):
+        """Drop one role's partition (or everything)."""
+        with self._lock:
+            roles = [role] if role is not None else list(self._partitions)
+            for r in roles:
+                self._drop_role(r)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": sum(len(p) for p in self._partitions.values()),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "invalidations": self.invalidations,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Process-wide answer cache (None if disabled via RAG_ANSWER_CACHE)."""
+    global _cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache()
+                # answers were built from the old grants; drop them with the grants
+                on_grants_changed(_cache.invalidate)
+    return _cache
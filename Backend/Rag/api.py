@@ -1,14 +1,30 @@
+import json
+import time
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException
+import threading
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from Backend.Rag.rag_chain import RAGChain
+from Backend.Rag.rag_chain import run_rag_query, stream_rag_query
+from Backend.Rag.model_registry import get_registry
+from Backend.Rag.inference_pool import get_inference_pool, PoolOverloaded
+from Backend.Rag.answer_cache import get_answer_cache
+from Backend.metrics import get_metrics, record_stages
 from Backend.auth.routes import get_current_user_role as require_token  # returns {"username":..., "role":...}
 
 router = APIRouter()
 
-# Logger
+# Logger (configured once at startup by Backend.logging_config)
 logger = logging.getLogger("rag_api")
-logger.setLevel(logging.DEBUG)
+
+metrics = get_metrics()
+metrics.gauge("rag_pool_pending", lambda: get_inference_pool().stats()["pending"])
+metrics.gauge(
+    "rag_queue_depth",
+    lambda: {(("queue", name),): n for name, n in get_registry().queue_depths().items()} or None,
+)
+metrics.gauge("rag_answer_cache_entries", lambda: (get_answer_cache().stats()["entries"] if get_answer_cache() else None))
 
 # -----------------------------
 # Request Schema
@@ -17,13 +33,56 @@ class RAGQuery(BaseModel):
     question: str
 
 
+# How often we poll for client disconnects while a query is queued/running
+DISCONNECT_POLL_SECONDS = 0.5
+
+
+async def _wait_for_disconnect(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+
+def _format_sources(docs, scores):
+    # "score" is the dense similarity; "rrf_score" / "rerank_score" are present
+    # when hybrid fusion / the re-ranker ordered the results
+    return [
+        {
+            "source": d.metadata.get("source", "unknown"),
+            "role": d.metadata.get("role", "unknown"),
+            **{name: round(value, 4) for name, value in score.items()},
+            "content_snippet": d.page_content[:300],
+        }
+        for d, score in zip(docs, scores)
+    ]
+
+
+def _busy(e: PoolOverloaded):
+    return HTTPException(
+        status_code=503,
+        detail="RAG service busy, retry later",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _record_result(role: str, endpoint: str, timings: dict, cached: bool, tokens: int):
+    record_stages(role, timings, endpoint=endpoint)
+    metrics.inc("rag_answer_cache_total", role=role, result="hit" if cached else "miss")
+    if tokens:
+        metrics.inc("rag_tokens_generated_total", tokens, role=role)
+
+
 # -----------------------------
 # RAG ENDPOINT
 # -----------------------------
 @router.post("/rag/query")
-def rag_query(payload: RAGQuery, user=Depends(require_token)):
+async def rag_query(payload: RAGQuery, request: Request, user=Depends(require_token)):
     """
     Performs a RAG query using the user's role from the JWT token.
+    Heavy work runs on the dedicated inference pool, not FastAPI's threadpool.
     """
 
     question = payload.question
@@ -32,41 +91,51 @@ def rag_query(payload: RAGQuery, user=Depends(require_token)):
     if not role:
         raise HTTPException(status_code=403, detail="User role missing")
 
-    logger.info(f"[RAG-API] Query received | user_role={role} | question={question}")
+    # question text only at DEBUG (sampled); INFO carries no user content
+    logger.info("Query received", extra={"role": role, "question_chars": len(question)})
+    logger.debug("Query text", extra={"role": role, "question": question})
+    started = time.perf_counter()
 
     # -----------------------------
-    # Initialize RAG Chain
+    # Run RAG inference on the bounded pool (single retrieval pass)
     # -----------------------------
+    pool = get_inference_pool()
     try:
-        chain = RAGChain(role)
-    except Exception as e:
-        logger.exception("[RAG-API] Failed to initialize RAGChain")
-        raise HTTPException(status_code=500, detail="RAG initialization error")
+        work = pool.submit(run_rag_query, role, question, time.time())
+    except PoolOverloaded as e:
+        logger.warning("Inference queue full; rejecting request", extra={"role": role})
+        metrics.inc("rag_requests_total", endpoint="query", role=role, status="503")
+        raise _busy(e)
+
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+
+    if not work.done():
+        # client went away: drop the queued job instead of computing an unused answer
+        work.cancel()
+        logger.info("Client disconnected; cancelled query", extra={"role": role})
+        metrics.inc("rag_requests_total", endpoint="query", role=role, status="499")
+        raise HTTPException(status_code=499, detail="Client closed request")
 
-    # -----------------------------
-    # Run RAG inference
-    # -----------------------------
     try:
-        answer = chain.invoke(question)
+        result = work.result()
     except Exception:
-        logger.exception("[RAG-API] Error during RAG execution")
+        logger.exception("Error during RAG execution", extra={"role": role})
+        metrics.inc("rag_requests_total", endpoint="query", role=role, status="500")
         raise HTTPException(status_code=500, detail="RAG execution failed")
 
+    answer = result["answer"]
+    _record_result(role, "query", result["timings"], result.get("cached", False), result.get("tokens_generated", 0))
+    metrics.inc("rag_requests_total", endpoint="query", role=role, status="200")
+    metrics.observe("rag_request_seconds", time.perf_counter() - started, endpoint="query", role=role)
+
     # -----------------------------
-    # Collect Source Documents
+    # Sources = the documents the model actually saw
     # -----------------------------
-    try:
-        docs = chain.retriever.invoke(question)
-        sources = [
-            {
-                "source": d.metadata.get("source", "unknown"),
-                "role": d.metadata.get("role", "unknown"),
-                "content_snippet": d.page_content[:300],
-            }
-            for d in docs
-        ]
-    except Exception:
-        sources = []
+    sources = _format_sources(result["docs"], result["scores"])
 
     # -----------------------------
     # Final Response
@@ -75,5 +144,94 @@ def rag_query(payload: RAGQuery, user=Depends(require_token)):
         "role": role,
         "question": question,
         "answer": answer,
-        "sources": sources
+        "sources": sources,
+        "timings": {k: round(v, 4) for k, v in result["timings"].items()},
+        "context": result.get("context"),
+        "cached": result.get("cached", False),
     }
+
+
+# -----------------------------
+# STREAMING RAG ENDPOINT (SSE)
+# -----------------------------
+_STREAM_END = object()
+
+
+@router.post("/rag/query/stream")
+async def rag_query_stream(payload: RAGQuery, request: Request, user=Depends(require_token)):
+    """
+    Server-Sent Events variant of /rag/query.
+    Emits `sources` first, then `token` events as they are generated, then `done`.
+    """
+    question = payload.question
+    role = user.get("role")
+
+    if not role:
+        raise HTTPException(status_code=403, detail="User role missing")
+
+    pool = get_inference_pool()
+    if pool.kind == "process":
+        # events are pushed back through an in-process callback
+        raise HTTPException(status_code=501, detail="Streaming requires RAG_POOL_KIND=thread")
+
+    logger.info("Stream query received", extra={"role": role, "question_chars": len(question)})
+    logger.debug("Query text", extra={"role": role, "question": question})
+    started = time.perf_counter()
+
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    stop_event = threading.Event()
+
+    def emit(event):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    try:
+        work = pool.submit(stream_rag_query, role, question, emit, stop_event, time.time())
+    except PoolOverloaded as e:
+        logger.warning("Inference queue full; rejecting stream request", extra={"role": role})
+        metrics.inc("rag_requests_total", endpoint="stream", role=role, status="503")
+        raise _busy(e)
+
+    work.add_done_callback(lambda _f: events.put_nowait(_STREAM_END))
+
+    async def event_source():
+        try:
+            while True:
+                event = await events.get()
+                if event is _STREAM_END:
+                    break
+                kind = event["event"]
+                if kind == "sources":
+                    yield _sse("sources", {"role": role, "sources": _format_sources(event["docs"], event["scores"])})
+                elif kind == "token":
+                    yield _sse("token", {"text": event["text"]})
+                elif kind == "done":
+                    _record_result(role, "stream", event["timings"], False, event.get("tokens_generated", 0))
+                    yield _sse("done", {"timings": {k: round(v, 4) for k, v in event["timings"].items()}})
+
+            if not work.cancelled() and work.exception() is not None:
+                logger.error("Error during streaming RAG execution", exc_info=work.exception(), extra={"role": role})
+                yield _sse("error", {"detail": "RAG execution failed"})
+        finally:
+            # client disconnected or stream finished: stop generation and drop queued work
+            stop_event.set()
+            work.cancel()
+            metrics.observe("rag_request_seconds", time.perf_counter() - started, endpoint="stream", role=role)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/rag/models")
+def rag_models(user=Depends(require_token)):
+    """
+    Load times and memory of the shared models (confirms cold start happened once).
+    """
+    report = get_registry().report()
+    report["inference_pool"] = get_inference_pool().stats()
+    cache = get_answer_cache()
+    report["answer_cache"] = cache.stats() if cache else None
+    return report
@@ -0,0 +1,118 @@
+# Backend/Rag/batch_scheduler.py
+"""
+Dynamic micro-batching for the text2text generation pipeline.
+
+Concurrent requests submit prompts; a single worker thread gathers them for
+up to `window_ms` (or until `max_batch_size` prompts are waiting), runs them
+through the pipeline as one padded batch and hands each answer back to the
+caller that submitted it.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger("rag_batcher")
+
+BATCH_WINDOW_MS = float(os.getenv("RAG_BATCH_WINDOW_MS", "20"))
+BATCH_MAX_SIZE = int(os.getenv("RAG_BATCH_MAX_SIZE", "8"))
+# generation length for every generation path (rag_chain imports it)
+GEN_MAX_LENGTH = 300
+
+
+def _extract_text(item) -> str:
+    # different HF versions use different keys: prefer generated_text then text
+    if isinstance(item, list):
+        item = item[0] if item else {}
+    if isinstance(item, dict):
+        return item.get("generated_text") or item.get("text") or str(item)
+    return str(item)
+
+
+class GenerationBatcher:
+    def __init__(self, llm_pipeline, window_ms: float = BATCH_WINDOW_MS, max_batch_size: int = BATCH_MAX_SIZE):
+        self.llm_pipeline = llm_pipeline
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+
+        self.batches = 0
+        self.prompts = 0
+        self.max_seen_batch = 0
+
+        self._worker = threading.Thread(target=self._loop, name="rag-gen-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt: str) -> Future:
+        """Queue a prompt; the returned Future resolves to the answer string."""
+        fut = Future()
+        self._queue.put((prompt, fut))
+        return fut
+
+    def generate(self, prompt: str, timeout: float = None) -> str:
+        """Blocking helper: submit and wait for the answer."""
+        return self.submit(prompt).result(timeout=timeout)
+
+    def _collect(self):
+        # block for the first prompt, then gather more until window closes or batch is full
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            batch = self._collect()
+            if batch is None:
+                break
+
+            # drop requests whose caller already gave up
+            batch = [(p, f) for p, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            prompts = [p for p, _ in batch]
+            try:
+                outputs = self.llm_pipeline(prompts, max_length=GEN_MAX_LENGTH, batch_size=len(prompts))
+            except Exception as e:
+                logger.exception("Batched generation failed (size=%d)", len(prompts))
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.prompts += len(prompts)
+            self.max_seen_batch = max(self.max_seen_batch, len(prompts))
+
+            for (_, fut), out in zip(batch, outputs):
+                fut.set_result(_extract_text(out))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "prompts": self.prompts,
+            "avg_batch_size": round(self.prompts / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size_seen": self.max_seen_batch,
+            "queue_depth": self._queue.qsize(),
+        }
+
+    def close(self):
+        self._stopped.set()
+        self._queue.put(None)
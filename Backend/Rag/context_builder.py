@@ -0,0 +1,135 @@
+# Backend/Rag/context_builder.py
+"""
+Token-budgeted context assembly.
+
+Fills the generator's input budget greedily in relevance order, counting
+tokens with the model's own tokenizer (counts are cached per chunk text).
+Text repeated between neighbouring chunks (loader's chunk_overlap) is removed
+before it costs tokens, and only the last chunk that does not fit whole is
+cut, at a token boundary.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+# a chunk cut to fewer tokens than this is not worth including
+MIN_PARTIAL_TOKENS = 32
+# shortest shared prefix/suffix (chars) treated as chunk overlap
+MIN_OVERLAP_CHARS = 50
+# loader uses chunk_overlap=150; no need to look further than this
+MAX_OVERLAP_CHARS = 300
+TOKEN_COUNT_CACHE_SIZE = 50_000
+
+
+class TokenCounter:
+    """Tokenizer wrapper with an LRU of token counts keyed by text hash."""
+
+    def __init__(self, tokenizer, max_entries: int = TOKEN_COUNT_CACHE_SIZE):
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, text: str):
+        return self.tokenizer(text, add_special_tokens=False)["input_ids"]
+
+    def count(self, text: str) -> int:
+        key = hashlib.sha1(text.encode("utf-8")).digest()
+        with self._lock:
+            n = self._cache.get(key)
+            if n is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return n
+        n = len(self.encode(text))
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = n
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return n
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        ids = self.encode(text)[:max_tokens]
+        return self.tokenizer.decode(ids, skip_special_tokens=True)
+
+
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of a that is a prefix of b (>= MIN_OVERLAP_CHARS)."""
+    max_len = min(len(a), len(b), MAX_OVERLAP_CHARS)
+    for n in range(max_len, MIN_OVERLAP_CHARS - 1, -1):
+        if a.endswith(b[:n]):
+            return n
+    return 0
+
+
+def _strip_redundant(text: str, selected):
+    """Drops text already covered by selected chunks; returns None if nothing new remains."""
+    for prev in selected:
+        if text in prev:
+            return None
+        n = _overlap(prev, text)
+        if n:
+            text = text[n:].lstrip()
+        else:
+            n = _overlap(text, prev)
+            if n:
+                text = text[:-n].rstrip()
+        if not text:
+            return None
+    return text
+
+
+def assemble_context(texts, counter: TokenCounter, budget: int):
+    """
+    texts: chunk texts in relevance order (best first).
+    Returns (pieces, info) with info = {"tokens_used", "budget", "chunks_used",
+    "chunks_dropped", "chunks_truncated", "used_indices"}; used_indices are the
+    positions in texts that made it into the context.
+    """
+    sep_tokens = counter.count(CONTEXT_SEPARATOR) if texts else 0
+    pieces = []
+    used_indices = []
+    used = 0
+    dropped = truncated = 0
+
+    for i, raw in enumerate(texts):
+        text = (raw or "").strip()
+        if not text:
+            continue
+        text = _strip_redundant(text, pieces)
+        if text is None:
+            dropped += 1
+            continue
+
+        sep = sep_tokens if pieces else 0
+        cost = counter.count(text) + sep
+        if used + cost <= budget:
+            pieces.append(text)
+            used_indices.append(i)
+            used += cost
+            continue
+
+        remaining = budget - used - sep
+        if remaining >= MIN_PARTIAL_TOKENS:
+            pieces.append(counter.truncate(text, remaining))
+            used_indices.append(i)
+            used += remaining + sep
+            truncated += 1
+        else:
+            dropped += 1
+        # budget is spent; everything after this is less relevant
+        dropped += len(texts) - i - 1
+        break
+
+    return pieces, {
+        "tokens_used": used,
+        "budget": budget,
+        "chunks_used": len(pieces),
+        "chunks_dropped": dropped,
+        "chunks_truncated": truncated,
+        "used_indices": used_indices,
+    }
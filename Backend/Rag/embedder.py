@@ -1,6 +1,16 @@
 
-from langchain_huggingface import HuggingFaceEmbeddings
+import logging
+
+from Backend.Rag.embedding_cache import with_embedding_cache
+from Backend.Rag.inference_backend import build_embeddings, cache_namespace
+
+logger = logging.getLogger("rag_embedder")
+
 
 def get_embedder():
-    print("[EMBED] Loading MiniLM embeddings...")
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    logger.info("Loading MiniLM embeddings")
+    model_name = "sentence-transformers/all-MiniLM-L6-v2"
+    # normalized vectors: ingestion stores unit-length float32 and queries must match
+    # (same RAG_INFERENCE_BACKEND as the API so stored and query vectors agree)
+    embeddings = build_embeddings(model_name)
+    return with_embedding_cache(embeddings, cache_namespace(model_name))
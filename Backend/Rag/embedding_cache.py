@@ -0,0 +1,249 @@
+# Backend/Rag/embedding_cache.py
+"""
+Persistent embedding cache keyed by (model name, sha256(text)).
+
+CachedEmbeddings wraps any LangChain Embeddings object. Vectors are stored as
+float32 blobs in SQLite, so re-ingesting, rebuilding a collection or moving
+CHROMA_PERSIST_DIR reuses vectors we already computed.
+
+The query path never waits on ingestion: query lookups use their own read
+connection (WAL readers do not block on the writer), and query vectors are
+written behind by a flusher thread in batches rather than committed inside
+the request.
+"""
+import os
+import time
+import atexit
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE", "true").lower() in ("1", "true", "yes")
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./Backend/Rag/embedding_cache.sqlite")
+EMBED_CACHE_MAX_ROWS = int(os.getenv("EMBED_CACHE_MAX_ROWS", "1000000"))
+
+# query vectors are buffered and flushed every N ms or once this many are pending
+EMBED_CACHE_QUERY_FLUSH_MS = int(os.getenv("EMBED_CACHE_QUERY_FLUSH_MS", "1000"))
+EMBED_CACHE_QUERY_FLUSH_ROWS = int(os.getenv("EMBED_CACHE_QUERY_FLUSH_ROWS", "256"))
+
+# check the row limit every N inserts instead of on every write
+_PRUNE_EVERY = 1000
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, model_name: str, path: str = EMBED_CACHE_PATH, max_rows: int = EMBED_CACHE_MAX_ROWS):
+        self.inner = inner
+        self.model_name = model_name
+        self.path = path
+        self.max_rows = max_rows
+
+        self._lock = threading.Lock()
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_created ON embeddings (created_at)")
+        self._conn.commit()
+        # query-path reads: separate connection and lock, so they never queue behind ingestion writes
+        self._read_lock = threading.Lock()
+        self._read_conn = sqlite3.connect(path, check_same_thread=False)
+
+        # write-behind buffer for query vectors: (model, key) -> vector
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flush_wakeup = threading.Event()
+        self._flusher = None
+        self._closed = False
+
+        self.hits = 0
+        self.misses = 0
+        self._inserts_since_prune = 0
+
+    # -----------------------------
+    # storage
+    # -----------------------------
+    def _get_many(self, keys, model=None, reader=False):
+        model = model or self.model_name
+        found = {}
+        lock, conn = (self._read_lock, self._read_conn) if reader else (self._lock, self._conn)
+        with lock:
+            # SQLite caps the number of bound parameters; query in slices
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                marks = ",".join("?" * len(part))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({marks})",
+                    [model, *part],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _put_many(self, items, model=None):
+        model = model or self.model_name
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, created_at) VALUES (?, ?, ?, ?)",
+                [(model, k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items],
+            )
+            self._conn.commit()
+            self._inserts_since_prune += len(items)
+            if self._inserts_since_prune >= _PRUNE_EVERY:
+                self._inserts_since_prune = 0
+                self._prune()
+
+    def _get_queries(self, keys, model):
+        """Query-vector lookup: the write-behind buffer first, then the read connection."""
+        found = {}
+        with self._pending_lock:
+            for k in keys:
+                vector = self._pending.get((model, k))
+                if vector is not None:
+                    found[k] = list(vector)
+        rest = [k for k in keys if k not in found]
+        if rest:
+            found.update(self._get_many(rest, model=model, reader=True))
+        return found
+
+    def _put_queries(self, items, model):
+        """Buffers query vectors for the flusher thread instead of writing them on the request path."""
+        with self._pending_lock:
+            if self._closed:
+                return
+            for k, v in items:
+                self._pending[(model, k)] = v
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="embed-cache-flush", daemon=True)
+                self._flusher.start()
+            full = len(self._pending) >= EMBED_CACHE_QUERY_FLUSH_ROWS
+        if full:
+            self._flush_wakeup.set()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._flush_wakeup.wait(EMBED_CACHE_QUERY_FLUSH_MS / 1000.0)
+            self._flush_wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Writes buffered query vectors (one transaction per model)."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        by_model = {}
+        for (model, k), v in pending.items():
+            by_model.setdefault(model, []).append((k, v))
+        for model, items in by_model.items():
+            self._put_many(items, model=model)
+
+    def close(self):
+        self._closed = True
+        self._flush_wakeup.set()
+        self.flush()
+
+    def _prune(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_rows
+        if excess > 0:
+            # drop the oldest vectors first
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY created_at LIMIT ?)",
+                (excess,),
+            )
+            self._conn.commit()
+
+    # -----------------------------
+    # Embeddings interface
+    # -----------------------------
+    def embed_documents(self, texts):
+        keys = [_text_key(t) for t in texts]
+        found = self._get_many(list(set(keys)))
+
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k not in found and k not in missing:
+                missing[k] = t
+
+        self.hits += len(keys) - sum(1 for k in keys if k in missing)
+        self.misses += sum(1 for k in keys if k in missing)
+
+        if missing:
+            vectors = self.inner.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self._put_many(new_items)
+            found.update({k: list(v) for k, v in new_items})
+
+        return [found[k] for k in keys]
+
+    def embed_query(self, text):
+        # some models embed queries differently from documents, so keep them apart
+        model = self.model_name + "#query"
+        key = _text_key(text)
+        found = self._get_queries([key], model)
+        if key in found:
+            self.hits += 1
+            return found[key]
+
+        self.misses += 1
+        vector = self.inner.embed_query(text)
+        self._put_queries([(key, vector)], model)
+        return list(vector)
+
+    def embed_queries(self, texts):
+        """Batched embed_query: one lookup and at most one forward pass for all texts."""
+        model = self.model_name + "#query"
+        keys = [_text_key(t) for t in texts]
+        found = self._get_queries(list(set(keys)), model)
+        missing = {k: t for k, t in zip(keys, texts) if k not in found}
+
+        self.hits += len(keys) - sum(1 for k in keys if k in missing)
+        self.misses += sum(1 for k in keys if k in missing)
+
+        if missing:
+            # our HuggingFaceEmbeddings has no query_encode_kwargs, so queries
+            # encode exactly like documents and can share one batch
+            vectors = self.inner.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self._put_queries(new_items, model)
+            found.update({k: list(v) for k, v in new_items})
+
+        return [found[k] for k in keys]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "max_rows": self.max_rows,
+            "pending_query_writes": len(self._pending),
+        }
+
+
+def with_embedding_cache(embeddings: Embeddings, model_name: str) -> Embeddings:
+    """Wraps embeddings in the persistent cache unless disabled via EMBED_CACHE."""
+    if not EMBED_CACHE_ENABLED:
+        return embeddings
+    cache = CachedEmbeddings(embeddings, model_name)
+    # write out buffered query vectors on interpreter exit
+    atexit.register(cache.close)
+    return cache
@@ -0,0 +1,169 @@
+# Backend/Rag/embedding_stage.py
+"""
+Explicit, pipelined embedding stage for ingestion.
+
+Chunks are embedded in fixed-size batches (normalized float32) on the calling
+thread while a background writer upserts the previous batch into Chroma, so
+embedding batch N+1 overlaps with writing batch N. Written chunk IDs are
+appended to a checkpoint file so an interrupted ingest can resume without
+re-embedding what already landed in the store.
+"""
+import os
+import time
+import json
+import queue
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger("rag_embedding_stage")
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+
+def load_checkpoint(path: str) -> set:
+    """IDs already written by a previous (interrupted) run."""
+    done = set()
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    done.update(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def clear_checkpoint(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def to_float32_normalized(vectors) -> np.ndarray:
+    arr = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return arr / norms
+
+
+class EmbeddingStage:
+    def __init__(self, embeddings, store_for_label, batch_size: int = EMBED_BATCH_SIZE, checkpoint_path: str = None):
+        """
+        store_for_label: callable(role label) -> Chroma vectorstore the chunk
+        belongs in (the same store for every label in the shared layout).
+        """
+        self.embeddings = embeddings
+        self.store_for_label = store_for_label
+        self.batch_size = max(1, batch_size)
+        self.checkpoint_path = checkpoint_path
+        self.done_ids = load_checkpoint(checkpoint_path) if checkpoint_path else set()
+
+        self._docs, self._ids = [], []
+        # maxsize=1: at most one batch waits while another is being written
+        self._queue = queue.Queue(maxsize=1)
+        self._error = None
+
+        self.chunks = 0
+        self.skipped = 0
+        self.embed_seconds = 0.0
+        self.write_seconds = 0.0
+        self._start = time.perf_counter()
+
+        if self.done_ids:
+            logger.info("Resuming embedding from checkpoint", extra={"chunks_done": len(self.done_ids)})
+
+        self._writer = threading.Thread(target=self._write_loop, name="ingest-writer", daemon=True)
+        self._writer.start()
+
+    # -----------------------------
+    # producer side
+    # -----------------------------
+    def add(self, docs, ids):
+        for d, cid in zip(docs, ids):
+            if cid in self.done_ids:
+                self.skipped += 1
+                continue
+            self._docs.append(d)
+            self._ids.append(cid)
+            if len(self._ids) >= self.batch_size:
+                self._embed_batch()
+
+    def _embed_batch(self):
+        self._raise_writer_error()
+        docs, ids = self._docs, self._ids
+        self._docs, self._ids = [], []
+        if not ids:
+            return
+
+        t0 = time.perf_counter()
+        texts = [d.page_content for d in docs]
+        vectors = to_float32_normalized(self.embeddings.embed_documents(texts))
+        self.embed_seconds += time.perf_counter() - t0
+
+        # blocks only if the writer is still busy with the batch before the previous one
+        self._queue.put((ids, texts, [d.metadata for d in docs], vectors))
+
+    def close(self) -> dict:
+        """Flush the last batch, wait for the writer and return throughput stats."""
+        self._embed_batch()
+        self._queue.put(None)
+        self._writer.join()
+        self._raise_writer_error()
+        return self.stats()
+
+    # -----------------------------
+    # writer side
+    # -----------------------------
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue  # drain so the producer never blocks forever
+            ids, texts, metadatas, vectors = item
+            try:
+                t0 = time.perf_counter()
+                # route rows to their collection (one group in the shared layout)
+                groups = {}
+                for i, meta in enumerate(metadatas):
+                    collection = self.store_for_label(meta.get("role"))._collection
+                    groups.setdefault(id(collection), (collection, []))[1].append(i)
+                for collection, rows in groups.values():
+                    collection.upsert(
+                        ids=[ids[i] for i in rows],
+                        embeddings=vectors[rows].tolist(),
+                        metadatas=[metadatas[i] for i in rows],
+                        documents=[texts[i] for i in rows],
+                    )
+                self.write_seconds += time.perf_counter() - t0
+                self.chunks += len(ids)
+                self._checkpoint(ids)
+            except Exception as e:
+                self._error = e
+
+    def _checkpoint(self, ids):
+        if not self.checkpoint_path:
+            return
+        with open(self.checkpoint_path, "a") as f:
+            f.write(json.dumps(ids) + "\n")
+
+    def _raise_writer_error(self):
+        if self._error is not None:
+            raise RuntimeError("Chroma write failed during ingestion") from self._error
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self._start
+        return {
+            "chunks": self.chunks,
+            "skipped_from_checkpoint": self.skipped,
+            "batch_size": self.batch_size,
+            "embed_seconds": round(self.embed_seconds, 3),
+            "write_seconds": round(self.write_seconds, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_second": round(self.chunks / elapsed, 2) if elapsed > 0 else 0.0,
+        }
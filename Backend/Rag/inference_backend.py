@@ -0,0 +1,148 @@
+# Backend/Rag/inference_backend.py
+"""
+Pluggable CPU inference backend for the embedder and the seq2seq generator.
+
+RAG_INFERENCE_BACKEND selects how EMBED_MODEL / HF_LLM_MODEL are executed:
+
+  fp32  - plain PyTorch (the original behaviour)
+  int8  - PyTorch with dynamic int8 quantization of every nn.Linear
+  onnx  - ONNX Runtime (needs `optimum[onnxruntime]`; models are exported on first load)
+
+RAG_EMBED_BACKEND / RAG_GEN_BACKEND override the choice per stage.
+RAG_EMBED_THREADS / RAG_GEN_THREADS set intra-op threads per stage (0 = library
+default). ONNX Runtime sessions honour them independently; PyTorch has a single
+process-wide intra-op pool, so the torch backends use the larger of the two.
+"""
+import os
+import logging
+
+logger = logging.getLogger("rag_inference_backend")
+
+BACKENDS = ("fp32", "int8", "onnx")
+
+INFERENCE_BACKEND = os.getenv("RAG_INFERENCE_BACKEND", "fp32").lower()
+EMBED_BACKEND = os.getenv("RAG_EMBED_BACKEND", INFERENCE_BACKEND).lower()
+GEN_BACKEND = os.getenv("RAG_GEN_BACKEND", INFERENCE_BACKEND).lower()
+EMBED_THREADS = int(os.getenv("RAG_EMBED_THREADS", "0"))
+GEN_THREADS = int(os.getenv("RAG_GEN_THREADS", "0"))
+
+
+def _check(backend: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {BACKENDS}")
+
+
+def _set_torch_threads(threads: int):
+    """
+    Sets torch's process-wide intra-op pool to the largest configured thread
+    count, so the embedder and generator settings never cut each other's
+    threads. This can be below torch's default (the core count): configuring
+    threads caps the pool, which is how CPU oversubscription is avoided.
+    """
+    if threads <= 0:
+        return
+    import torch
+    wanted = max(threads, EMBED_THREADS, GEN_THREADS)
+    if torch.get_num_threads() != wanted:
+        torch.set_num_threads(wanted)
+
+
+def _ort_session_options(threads: int):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    if threads > 0:
+        options.intra_op_num_threads = threads
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return options
+
+
+def quantize_int8(model):
+    """In-place dynamic int8 quantization of the Linear layers (weights int8, activations quantized on the fly)."""
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def cache_namespace(model_name: str, backend: str = None) -> str:
+    """Embedding cache key namespace; quantized/ONNX vectors differ slightly from fp32."""
+    backend = backend or EMBED_BACKEND
+    suffix = "" if backend == "fp32" else f":{backend}"
+    return f"{model_name}:normalized{suffix}"
+
+
+# -----------------------------
+# Embedder
+# -----------------------------
+def build_embeddings(model_name: str, backend: str = None, threads: int = None):
+    """LangChain HuggingFaceEmbeddings (normalized) executed on the chosen backend."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    backend = backend or EMBED_BACKEND
+    threads = EMBED_THREADS if threads is None else threads
+    _check(backend)
+
+    model_kwargs = {"device": "cpu"}
+    if backend == "onnx":
+        model_kwargs["backend"] = "onnx"
+        model_kwargs["model_kwargs"] = {"session_options": _ort_session_options(threads)}
+    else:
+        _set_torch_threads(threads)
+
+    embeddings = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={"normalize_embeddings": True},
+    )
+    if backend == "int8":
+        quantize_int8(embeddings._client)
+    logger.info("Embedder %s on %s backend (threads=%s)", model_name, backend, threads or "default")
+    return embeddings
+
+
+# -----------------------------
+# Generator
+# -----------------------------
+def build_generator(model_name: str, backend: str = None, threads: int = None, **pipeline_kwargs):
+    """transformers text2text-generation pipeline executed on the chosen backend."""
+    from transformers import AutoTokenizer, pipeline
+
+    backend = backend or GEN_BACKEND
+    threads = GEN_THREADS if threads is None else threads
+    _check(backend)
+
+    if backend == "fp32":
+        _set_torch_threads(threads)
+        model = model_name
+    elif backend == "int8":
+        from transformers import AutoModelForSeq2SeqLM
+        _set_torch_threads(threads)
+        model = quantize_int8(AutoModelForSeq2SeqLM.from_pretrained(model_name).eval())
+    else:
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError as e:
+            raise RuntimeError(
+                "RAG_GEN_BACKEND=onnx needs optimum with onnxruntime: pip install 'optimum[onnxruntime]'"
+            ) from e
+        model = ORTModelForSeq2SeqLM.from_pretrained(
+            model_name, export=True, session_options=_ort_session_options(threads)
+        )
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    generator = pipeline(
+        "text2text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        device=-1,
+        **pipeline_kwargs,
+    )
+    logger.info("Generator %s on %s backend (threads=%s)", model_name, backend, threads or "default")
+    return generator
+
+
+def describe() -> dict:
+    return {
+        "embed_backend": EMBED_BACKEND,
+        "gen_backend": GEN_BACKEND,
+        "embed_threads": EMBED_THREADS,
+        "gen_threads": GEN_THREADS,
+    }
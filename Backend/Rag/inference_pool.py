@@ -0,0 +1,106 @@
+# Backend/Rag/inference_pool.py
+"""
+Dedicated worker pool for CPU-heavy RAG work (embedding, Chroma search,
+generation), kept separate from FastAPI's default threadpool so a burst of
+questions cannot starve /auth and /roles.
+
+Admission is bounded: once RAG_MAX_PENDING jobs are queued or running, new
+jobs are rejected with PoolOverloaded instead of piling up.
+"""
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+logger = logging.getLogger("rag_pool")
+
+POOL_KIND = os.getenv("RAG_POOL_KIND", "thread")  # "thread" or "process"
+POOL_WORKERS = int(os.getenv("RAG_WORKERS", "8"))
+MAX_PENDING = int(os.getenv("RAG_MAX_PENDING", "32"))
+RETRY_AFTER_SECONDS = int(os.getenv("RAG_RETRY_AFTER", "5"))
+
+
+class PoolOverloaded(Exception):
+    """Raised when the admission queue is full."""
+
+    def __init__(self, retry_after: int = RETRY_AFTER_SECONDS):
+        super().__init__("RAG inference queue is full")
+        self.retry_after = retry_after
+
+
+class InferencePool:
+    def __init__(self, kind: str = POOL_KIND, workers: int = POOL_WORKERS, max_pending: int = MAX_PENDING):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.cancelled = 0
+
+        if kind == "process":
+            # each worker process builds its own model registry on first use
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rag-worker")
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolOverloaded()
+            self._pending += 1
+
+    def _release(self, _fut=None):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args) -> asyncio.Future:
+        """
+        Admit and schedule fn(*args); raises PoolOverloaded right away when
+        the queue is full. Cancelling the returned asyncio future cancels the
+        job if it has not started yet.
+        """
+        self._admit()
+        try:
+            cfut = self._executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        cfut.add_done_callback(self._release)
+        cfut.add_done_callback(self._count_cancelled)
+        return asyncio.wrap_future(cfut)
+
+    def _count_cancelled(self, cfut):
+        if cfut.cancelled():
+            self.cancelled += 1
+
+    async def run(self, fn, *args):
+        return await self.submit(fn, *args)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_inference_pool() -> InferencePool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = InferencePool()
+    return _pool
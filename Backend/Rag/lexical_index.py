@@ -0,0 +1,260 @@
+# Backend/Rag/lexical_index.py
+"""
+Compact BM25 inverted index, one per role label.
+
+Built by ingestion from the chunks stored in Chroma and written as flat numpy
+arrays (CSR-style postings), which the API memory-maps at startup:
+
+    <LEXICAL_DIR>/<label>/
+        CURRENT           name of the live build directory
+        <build id>/
+            vocab.json        term -> term id
+            offsets.npy       int64[n_terms + 1]   postings range per term
+            postings.npy      int32[n_postings]    doc numbers
+            tfs.npy           float32[n_postings]  term frequency per posting
+            doc_lens.npy      float32[n_docs]      tokens per doc
+            doc_ids.json      doc number -> chunk id
+            meta.json         avgdl / counts
+
+Every build goes into a fresh directory and is published by atomically
+replacing CURRENT, so a reader always opens all files of one build.
+"""
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import threading
+from collections import Counter
+
+import numpy as np
+
+from Backend.Rag.vector_store import VECTOR_DIR
+
+logger = logging.getLogger("rag_lexical_index")
+
+LEXICAL_DIR = os.getenv("RAG_LEXICAL_DIR", os.path.join(VECTOR_DIR, "lexical_index"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# words, numbers and codes such as INV-2023-0042 or HR/POL/7 kept as single tokens
+_TOKEN_RE = re.compile(r"\w+(?:[-/.]\w+)*")
+
+# how often (seconds) we re-read CURRENT to pick up a rebuilt index
+_RELOAD_CHECK_INTERVAL = 2.0
+
+
+def tokenize(text: str):
+    tokens = _TOKEN_RE.findall(text.lower())
+    # also index the parts of compound codes so "2023" matches "inv-2023-0042"
+    parts = [p for t in tokens if not t.isalnum() for p in re.split(r"[-/.]", t) if p]
+    return tokens + parts
+
+
+def _label_dir(label: str) -> str:
+    return os.path.join(LEXICAL_DIR, label.lower())
+
+
+def current_build(label: str):
+    """Directory of the live build for a label, or None if it was never built."""
+    label_dir = _label_dir(label)
+    try:
+        with open(os.path.join(label_dir, "CURRENT")) as f:
+            return os.path.join(label_dir, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def has_index(label: str) -> bool:
+    return current_build(label) is not None
+
+
+def _write_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def _write_npy(path, arr):
+    tmp = path + ".tmp.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# Build
+# -----------------------------
+def build_index(label: str, chunk_ids, texts):
+    """Builds and writes the index for one label from (chunk id, text) pairs."""
+    vocab = {}
+    term_col, doc_col, tf_col = [], [], []
+    doc_lens = np.zeros(len(texts), dtype=np.float32)
+
+    for doc_no, text in enumerate(texts):
+        counts = Counter(tokenize(text or ""))
+        doc_lens[doc_no] = sum(counts.values())
+        for term, tf in counts.items():
+            term_col.append(vocab.setdefault(term, len(vocab)))
+            doc_col.append(doc_no)
+            tf_col.append(tf)
+
+    # group postings by term id (stable, so doc numbers stay ascending per term)
+    term_arr = np.asarray(term_col, dtype=np.int64)
+    order = np.argsort(term_arr, kind="stable")
+    docs_arr = np.asarray(doc_col, dtype=np.int32)[order]
+    tfs_arr = np.asarray(tf_col, dtype=np.float32)[order]
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_arr, minlength=len(vocab)), out=offsets[1:])
+
+    label_dir = _label_dir(label)
+    build_id = f"build-{time.time_ns()}-{os.getpid()}"
+    out = os.path.join(label_dir, build_id)
+    os.makedirs(out)
+    _write_json(os.path.join(out, "vocab.json"), vocab)
+    _write_npy(os.path.join(out, "offsets.npy"), offsets)
+    _write_npy(os.path.join(out, "postings.npy"), docs_arr)
+    _write_npy(os.path.join(out, "tfs.npy"), tfs_arr)
+    _write_npy(os.path.join(out, "doc_lens.npy"), doc_lens)
+    _write_json(os.path.join(out, "doc_ids.json"), list(chunk_ids))
+    _write_json(os.path.join(out, "meta.json"), {
+        "label": label,
+        "n_docs": len(texts),
+        "n_terms": len(vocab),
+        "n_postings": int(offsets[-1]),
+        "avgdl": float(doc_lens.mean()) if len(texts) else 0.0,
+        "built_at": time.time(),
+    })
+    # publish: one atomic rename switches readers to the complete new build
+    tmp = os.path.join(label_dir, "CURRENT.tmp")
+    with open(tmp, "w") as f:
+        f.write(build_id)
+    os.replace(tmp, os.path.join(label_dir, "CURRENT"))
+    _remove_old_builds(label_dir, build_id)
+    logger.info(
+        "Built lexical index",
+        extra={"label": label, "chunks": len(texts), "terms": len(vocab), "build": build_id},
+    )
+
+
+def _remove_old_builds(label_dir: str, current: str, keep: int = 1):
+    """Deletes superseded builds, keeping the newest `keep` besides the live one for readers still opening it."""
+    builds = sorted(
+        (d for d in os.listdir(label_dir) if d.startswith("build-") and d != current),
+        key=lambda d: int(d.split("-")[1]),
+        reverse=True,
+    )
+    for name in builds[keep:]:
+        # memory-mapped files stay readable after unlink on POSIX; elsewhere retry next build
+        shutil.rmtree(os.path.join(label_dir, name), ignore_errors=True)
+
+
+def build_from_vectorstore(label: str, store, page_size: int = 5000, search_filter=None):
+    """Reads every chunk of a label back from Chroma and (re)builds its index."""
+    ids, texts = [], []
+    offset = 0
+    while True:
+        page = store._collection.get(
+            where=search_filter, include=["documents"], limit=page_size, offset=offset
+        )
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        texts.extend(page["documents"])
+        offset += len(page["ids"])
+    build_index(label, ids, texts)
+
+
+# -----------------------------
+# Query
+# -----------------------------
+class LexicalIndex:
+    def __init__(self, label: str, path: str = None):
+        path = path or current_build(label)
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "vocab.json")) as f:
+            self.vocab = json.load(f)
+        with open(os.path.join(path, "doc_ids.json")) as f:
+            self.doc_ids = json.load(f)
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.postings = np.load(os.path.join(path, "postings.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode="r")
+        self.doc_lens = np.load(os.path.join(path, "doc_lens.npy"), mmap_mode="r")
+        self.label = label
+        self.n_docs = self.meta["n_docs"]
+        self.avgdl = self.meta["avgdl"] or 1.0
+
+    def search(self, query: str, k: int):
+        """Returns [(chunk_id, bm25 score)] best first."""
+        if not self.n_docs:
+            return []
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        touched = False
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end]
+            df = end - start
+            idf = np.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.doc_lens[docs] / self.avgdl)
+            scores[docs] += idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+            touched = True
+        if not touched:
+            return []
+
+        k = min(k, self.n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+class LexicalIndexStore:
+    """Loads per-label indexes lazily and reloads them when ingestion rebuilds them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}  # label -> (index, build dir, last check)
+
+    def get(self, label: str):
+        now = time.monotonic()
+        cached = self._indexes.get(label)
+        if cached and now - cached[2] < _RELOAD_CHECK_INTERVAL:
+            return cached[0]
+
+        with self._lock:
+            build = current_build(label)
+            if build is None:
+                self._indexes[label] = (None, None, now)
+                return None
+            cached = self._indexes.get(label)
+            if cached and cached[1] == build:
+                self._indexes[label] = (cached[0], build, now)
+                return cached[0]
+            index = LexicalIndex(label, build)
+            self._indexes[label] = (index, build, now)
+            return index
+
+    def search(self, labels, query: str, k: int):
+        """BM25 top-k across the given labels' indexes (merged by score)."""
+        results = []
+        for label in labels:
+            index = self.get(label)
+            if index is not None:
+                results.extend(index.search(query, k))
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results[:k]
+
+
+def reciprocal_rank_fusion(ranked_lists, k: int, rrf_k: int = 60):
+    """Fuses ranked id lists: score(id) = sum 1 / (rrf_k + rank). Returns [(id, score)]."""
+    fused = {}
+    for ranked in ranked_lists:
+        for rank, item_id in enumerate(ranked, start=1):
+            fused[item_id] = fused.get(item_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda r: r[1], reverse=True)[:k]
@@ -1,7 +1,14 @@
 import os
+import logging
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+logger = logging.getLogger("rag_loader")
+
+# number of processes used to parse & split PDFs during ingestion
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
 
 def normalize_role(folder: str):
     """Convert folder name to a clean role."""
@@ -19,43 +26,105 @@ def normalize_role(folder: str):
     return "General"
 
 
-def load_documents(base_dir: str):
-    """
-    Loads PDF documents from department folders.
-    Automatically assigns role & source metadata.
-    """
-
-    all_docs = []
-    print(f"[INGEST] Scanning folder: {base_dir}")
-
+def iter_pdf_files(base_dir: str):
+    """Yields (full_path, role) for every PDF under base_dir."""
     for root, dirs, files in os.walk(base_dir):
         for file in files:
             if file.lower().endswith(".pdf"):
                 full_path = os.path.join(root, file)
-
                 folder_name = os.path.basename(root)
-                role = normalize_role(folder_name)
-
-                print(f"[INGEST] Loading PDF: {file} (role={role})")
-
-                loader = PyPDFLoader(full_path)
-                pages = loader.load()
+                yield full_path, normalize_role(folder_name)
 
-                for doc in pages:
-                    doc.metadata["role"] = role
-                    doc.metadata["source"] = full_path
-                    all_docs.append(doc)
 
-    print(f"[INGEST] Loaded {len(all_docs)} raw pages")
-
-    # Split documents into chunks
-    splitter = RecursiveCharacterTextSplitter(
+def get_splitter():
+    return RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=150,
         length_function=len
     )
 
-    final_docs = splitter.split_documents(all_docs)
-    print(f"[INGEST] Split into {len(final_docs)} chunks")
+
+def load_pdf(full_path: str, role: str):
+    """Loads one PDF and tags every page with role & source metadata."""
+    logger.debug("Loading PDF", extra={"file": os.path.basename(full_path), "role": role})
+
+    loader = PyPDFLoader(full_path)
+    pages = loader.load()
+
+    for doc in pages:
+        doc.metadata["role"] = role
+        doc.metadata["source"] = full_path
+    return pages
+
+
+def load_file_chunks(full_path: str, role: str):
+    """Loads and splits a single PDF into chunks."""
+    return get_splitter().split_documents(load_pdf(full_path, role))
+
+
+def _parse_file(path: str, role: str):
+    # top-level so it can be pickled into worker processes
+    return path, role, load_file_chunks(path, role)
+
+
+def iter_file_chunks(files, workers: int = INGEST_WORKERS):
+    """
+    Parses and splits (path, role) pairs across a process pool and yields
+    (path, role, chunks) as each file finishes, in completion order.
+    At most 2 * workers files are in flight, so memory stays bounded no
+    matter how many PDFs there are. Files that fail to parse are skipped.
+    """
+    files = iter(files)
+
+    if workers <= 1:
+        for path, role in files:
+            logger.info("Parsing %s", os.path.basename(path), extra={"role": role})
+            try:
+                yield _parse_file(path, role)
+            except Exception:
+                logger.exception("Failed to parse %s", path)
+        return
+
+    max_inflight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        inflight = {}
+
+        def submit_next():
+            for path, role in files:
+                # logged here, not in the worker: pool processes have no log pipeline of their own
+                logger.info("Parsing %s", os.path.basename(path), extra={"role": role})
+                inflight[pool.submit(_parse_file, path, role)] = path
+                return True
+            return False
+
+        while len(inflight) < max_inflight and submit_next():
+            pass
+
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                path = inflight.pop(fut)
+                try:
+                    yield fut.result()
+                except Exception:
+                    logger.exception("Failed to parse %s", path)
+                submit_next()
+
+
+def iter_documents(base_dir: str, workers: int = INGEST_WORKERS):
+    """Generator of chunks for every PDF under base_dir (parsed in parallel)."""
+    logger.info("Scanning folder %s", base_dir)
+    for _, _, chunks in iter_file_chunks(iter_pdf_files(base_dir), workers=workers):
+        yield from chunks
+
+
+def load_documents(base_dir: str):
+    """
+    Loads PDF documents from department folders.
+    Automatically assigns role & source metadata.
+    Returns the full list of chunks; prefer iter_documents() for large trees.
+    """
+    final_docs = list(iter_documents(base_dir))
+    logger.info("Split into %d chunks", len(final_docs))
 
     return final_docs
@@ -0,0 +1,226 @@
+# Backend/Rag/model_registry.py
+"""
+Process-wide registry for the heavy RAG resources.
+
+The embedder, the Chroma vector store and the HF generation pipeline are
+loaded at most once per process and shared by every RAGChain instance.
+"""
+import os
+import time
+import logging
+import threading
+
+from langchain_chroma import Chroma
+
+from Backend.Rag.batch_scheduler import GenerationBatcher
+from Backend.Rag.embedding_cache import with_embedding_cache
+from Backend.Rag.vector_store import collection_name_for
+from Backend.Rag.lexical_index import LexicalIndexStore
+from Backend.Rag.context_builder import TokenCounter
+from Backend.Rag.reranker import CrossEncoderReranker, RERANK_ENABLED
+from Backend.Rag.query_embedder import QueryEmbedder
+from Backend.Rag import inference_backend
+
+logger = logging.getLogger("rag_registry")
+
+VECTORSTORE_PATH = os.getenv("CHROMA_PERSIST_DIR", "./Backend/Rag/chroma_index")
+EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+HF_LLM_MODEL = os.getenv("HF_LLM_MODEL", "google/flan-t5-base")
+# Micro-batch concurrent generation requests (see batch_scheduler.py)
+RAG_BATCHING = os.getenv("RAG_BATCHING", "true").lower() in ("1", "true", "yes")
+
+
+def _rss_mb():
+    """Current resident memory of this process in MB (None if unavailable)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+        # ru_maxrss is KB on Linux; this is the peak, which is close enough for load accounting
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+
+class ModelRegistry:
+    """
+    Lazily loads and caches shared models. Every getter is thread-safe and
+    only the first caller pays the load cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._embeddings = None
+        self._query_embedder = None
+        self._vectorstores = {}
+        self._llm_pipeline = None
+        self._batcher = None
+        self._lexical = LexicalIndexStore()
+        self._token_counter = None
+        self._reranker = None
+        self.stats = {}
+
+    def _load(self, name, loader):
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        obj = loader()
+        elapsed = time.perf_counter() - start
+        rss_after = _rss_mb()
+
+        self.stats[name] = {
+            "load_seconds": round(elapsed, 3),
+            "rss_before_mb": round(rss_before, 1) if rss_before is not None else None,
+            "rss_after_mb": round(rss_after, 1) if rss_after is not None else None,
+            "loaded_at": time.time(),
+        }
+        logger.info("Loaded %s in %.2fs (rss=%s MB)", name, elapsed, self.stats[name]["rss_after_mb"])
+        return obj
+
+    def override(self, embeddings=None, llm_pipeline=None):
+        """
+        Install ready-made models instead of loading EMBED_MODEL / HF_LLM_MODEL
+        (benchmarks use lightweight stand-ins). Call before the first getter.
+        """
+        with self._lock:
+            if embeddings is not None:
+                self._embeddings = embeddings
+            if llm_pipeline is not None:
+                self._llm_pipeline = llm_pipeline
+
+    def get_embeddings(self):
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = self._load(
+                        "embeddings",
+                        lambda: with_embedding_cache(
+                            inference_backend.build_embeddings(EMBED_MODEL),
+                            inference_backend.cache_namespace(EMBED_MODEL),
+                        ),
+                    )
+        return self._embeddings
+
+    def get_query_embedder(self) -> QueryEmbedder:
+        """Question -> vector LRU plus cross-request micro-batching over the embedder."""
+        if self._query_embedder is None:
+            embeddings = self.get_embeddings()
+            with self._lock:
+                if self._query_embedder is None:
+                    self._query_embedder = QueryEmbedder(embeddings)
+        return self._query_embedder
+
+    def get_vectorstore(self, label: str = None):
+        """
+        Shared Chroma collection, or the per-label collection when
+        RAG_INDEX_LAYOUT=partitioned and a label is given.
+        """
+        name = collection_name_for(label)
+        store = self._vectorstores.get(name)
+        if store is None:
+            embeddings = self.get_embeddings()
+            with self._lock:
+                store = self._vectorstores.get(name)
+                if store is None:
+                    store = self._load(
+                        f"vectorstore:{name}",
+                        lambda: Chroma(
+                            persist_directory=VECTORSTORE_PATH,
+                            embedding_function=embeddings,
+                            collection_name=name,
+                        ),
+                    )
+                    self._vectorstores[name] = store
+        return store
+
+    def get_llm_pipeline(self):
+        if self._llm_pipeline is None:
+            with self._lock:
+                if self._llm_pipeline is None:
+                    # CPU only; fp32 / int8 / onnx chosen by RAG_INFERENCE_BACKEND
+                    self._llm_pipeline = self._load(
+                        "llm_pipeline",
+                        lambda: inference_backend.build_generator(
+                            HF_LLM_MODEL,
+                            max_length=512,  # generation max; keep reasonably small
+                            do_sample=False,
+                        ),
+                    )
+        return self._llm_pipeline
+
+    def get_generation_batcher(self):
+        """Shared micro-batching scheduler over the LLM pipeline (None if disabled)."""
+        if not RAG_BATCHING:
+            return None
+        if self._batcher is None:
+            llm = self.get_llm_pipeline()
+            with self._lock:
+                if self._batcher is None:
+                    self._batcher = GenerationBatcher(llm)
+        return self._batcher
+
+    def get_token_counter(self):
+        """Token counter over the generator's tokenizer (None if the pipeline has none)."""
+        if self._token_counter is None:
+            tokenizer = getattr(self.get_llm_pipeline(), "tokenizer", None)
+            if tokenizer is None:
+                return None
+            with self._lock:
+                if self._token_counter is None:
+                    self._token_counter = TokenCounter(tokenizer)
+        return self._token_counter
+
+    def get_reranker(self):
+        """Shared cross-encoder re-ranker (None unless RAG_RERANK is on)."""
+        if not RERANK_ENABLED:
+            return None
+        if self._reranker is None:
+            with self._lock:
+                if self._reranker is None:
+                    self._reranker = self._load("reranker", CrossEncoderReranker)
+        return self._reranker
+
+    def get_lexical_store(self) -> LexicalIndexStore:
+        """Per-label BM25 indexes (memory-mapped, loaded on first use)."""
+        return self._lexical
+
+    def warmup(self):
+        """Load everything up front (called at FastAPI startup)."""
+        self.get_embeddings()
+        self.get_query_embedder()
+        self.get_vectorstore()
+        self.get_llm_pipeline()
+        self.get_generation_batcher()
+        self.get_reranker()
+        return self.report()
+
+    def queue_depths(self) -> dict:
+        """Requests waiting in the shared micro-batchers (only those already started)."""
+        depths = {}
+        if self._batcher is not None:
+            depths["generation"] = self._batcher._queue.qsize()
+        if self._query_embedder is not None:
+            depths["query_embedding"] = self._query_embedder._queue.qsize()
+        return depths
+
+    def report(self):
+        """Load times and memory of every model loaded so far."""
+        return {
+            "loaded": sorted(self.stats.keys()),
+            "models": dict(self.stats),
+            "inference_backend": inference_backend.describe(),
+            "generation_batcher": self._batcher.stats() if self._batcher else None,
+            "reranker": self._reranker.stats() if self._reranker else None,
+            "query_embedder": self._query_embedder.stats() if self._query_embedder else None,
+            "embedding_cache": self._embeddings.stats() if hasattr(self._embeddings, "stats") else None,
+            "rss_mb": _rss_mb(),
+        }
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    return _registry
@@ -0,0 +1,188 @@
+# Backend/Rag/query_embedder.py
+"""
+In-process query embedding: an LRU of normalized question -> vector (size
+and TTL bounded) in front of a micro-batcher that embeds the questions of
+concurrent requests in a single forward pass.
+
+Misses go through the persistent embedding cache (embedding_cache.py) too, so
+a restarted process still avoids the model for questions seen before.
+"""
+import os
+import re
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger("rag_query_embedder")
+
+QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "10000"))
+QUERY_CACHE_TTL = float(os.getenv("RAG_QUERY_CACHE_TTL", "3600"))  # seconds
+QUERY_BATCH_WINDOW_MS = float(os.getenv("RAG_QUERY_BATCH_WINDOW_MS", "5"))
+QUERY_BATCH_MAX_SIZE = int(os.getenv("RAG_QUERY_BATCH_MAX_SIZE", "32"))
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Cache key only (case- and whitespace-insensitive); the original text is what gets embedded."""
+    return _WS_RE.sub(" ", question).strip().casefold()
+
+
+class QueryEmbedder:
+    def __init__(
+        self,
+        embeddings,
+        max_entries: int = QUERY_CACHE_SIZE,
+        ttl: float = QUERY_CACHE_TTL,
+        window_ms: float = QUERY_BATCH_WINDOW_MS,
+        max_batch_size: int = QUERY_BATCH_MAX_SIZE,
+    ):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._cache = OrderedDict()  # key -> (vector, expires_at)
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future, so identical concurrent questions embed once
+        self._queue = queue.Queue()
+
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.embedded = 0
+        self.max_seen_batch = 0
+
+        self._worker = threading.Thread(target=self._loop, name="rag-query-embedder", daemon=True)
+        self._worker.start()
+
+    # -----------------------------
+    # LRU
+    # -----------------------------
+    def _lookup(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        vector, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return vector
+
+    def _store(self, key, vector):
+        with self._lock:
+            self._cache[key] = (vector, time.monotonic() + self.ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            self._inflight.pop(key, None)
+
+    # -----------------------------
+    # public API
+    # -----------------------------
+    def submit(self, question: str) -> Future:
+        """Future resolving to the question's vector (immediately on a cache hit)."""
+        key = normalize_question(question)
+        with self._lock:
+            vector = self._lookup(key)
+            if vector is not None:
+                self.hits += 1
+                fut = Future()
+                fut.set_result(vector)
+                return fut
+            self.misses += 1
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            fut = Future()
+            self._inflight[key] = fut
+        # in-flight dedup means the first spelling seen for a key is the one embedded
+        self._queue.put((key, question, fut))
+        return fut
+
+    def embed(self, question: str, timeout: float = None):
+        return self.submit(question).result(timeout=timeout)
+
+    def embed_many(self, questions, timeout: float = None):
+        """Batched entry point: all misses ride in the same forward pass(es)."""
+        futures = [self.submit(q) for q in questions]
+        return [f.result(timeout=timeout) for f in futures]
+
+    # -----------------------------
+    # batch worker
+    # -----------------------------
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _embed_batch(self, texts):
+        if hasattr(self.embeddings, "embed_queries"):
+            return self.embeddings.embed_queries(texts)
+        if len(texts) == 1:
+            return [self.embeddings.embed_query(texts[0])]
+        return self.embeddings.embed_documents(texts)
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # embed the user's text, not the normalized key: cased models would
+            # otherwise see a different (lowercased) question
+            keys = [k for k, _, _ in batch]
+            try:
+                vectors = self._embed_batch([q for _, q, _ in batch])
+            except Exception as e:
+                logger.exception("Query embedding failed (size=%d)", len(keys))
+                with self._lock:
+                    for key in keys:
+                        self._inflight.pop(key, None)
+                for _, _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.embedded += len(keys)
+            self.max_seen_batch = max(self.max_seen_batch, len(keys))
+            for (key, _, fut), vector in zip(batch, vectors):
+                vector = list(vector)
+                self._store(key, vector)
+                fut.set_result(vector)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "batches": self.batches,
+            "avg_batch_size": round(self.embedded / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size_seen": self.max_seen_batch,
+        }
+
+    def close(self):
+        self._queue.put(None)
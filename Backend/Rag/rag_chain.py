@@ -1,26 +1,46 @@
 # Backend/Rag/rag_chain.py
 import os
+import time
 import logging
+import threading
 from typing import List
 
-from transformers import pipeline
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from transformers import TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
 from langchain_core.runnables import RunnableMap
 
-logger = logging.getLogger("rag_chain")
-logger.setLevel(logging.DEBUG)
-fh = logging.FileHandler("rag_chain_debug.log")
-fh.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-logger.addHandler(fh)
+from Backend.Rag.model_registry import get_registry, VECTORSTORE_PATH, EMBED_MODEL, HF_LLM_MODEL
+from Backend.Rag.answer_cache import get_answer_cache
+from Backend.Rag.vector_store import is_partitioned
+from Backend.Rag.lexical_index import reciprocal_rank_fusion
+from Backend.Rag.context_builder import assemble_context, CONTEXT_SEPARATOR
+from Backend.Rag.batch_scheduler import GEN_MAX_LENGTH
+from Backend.Rag.reranker import RERANK_POOL
+from Backend.auth.role_assigner import retrieval_filter, allowed_labels, on_grants_changed
+from Backend.metrics import profile_request, record_stages
 
-VECTORSTORE_PATH = os.getenv("CHROMA_PERSIST_DIR", "./Backend/Rag/chroma_index")
-EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-HF_LLM_MODEL = os.getenv("HF_LLM_MODEL", "google/flan-t5-base")
+# handlers/levels are set once at startup by Backend.logging_config
+logger = logging.getLogger("rag_chain")
 
-# maximum token-ish length we want to allow in LLM input; if context is larger we'll truncate by chars
-# (Token counts depend on model/tokenizer; pick conservatively)
+# fallback only: char budget used when the pipeline exposes no tokenizer
+# (normally the context is budgeted in tokens, see context_builder.py)
 MAX_CONTEXT_CHARS = 3000
+# flan-t5 input limit (tokens)
+MAX_INPUT_TOKENS = 512
+
+# Hybrid retrieval: fuse dense and BM25 results with reciprocal rank fusion
+RAG_HYBRID = os.getenv("RAG_HYBRID", "true").lower() in ("1", "true", "yes")
+# candidates taken from each retriever before fusion, as a multiple of k
+HYBRID_POOL_FACTOR = int(os.getenv("RAG_HYBRID_POOL_FACTOR", "3"))
+
+
+class _StopOnEvent(StoppingCriteria):
+    """Stops generate() once the given threading.Event is set (client went away)."""
+
+    def __init__(self, stop_event):
+        self.stop_event = stop_event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.stop_event.is_set()
 
 
 class RAGChain:
@@ -29,50 +49,33 @@ class RAGChain:
         role: string like "Marketing"
         k: number of retrieved docs to include
         """
-        print(f"[RAG] Building RAG chain for role={role}")
+        logger.info("Building RAG chain", extra={"role": role, "k": k})
         self.role = role
         self.k = k
 
-        # Embeddings
-        logger.info("Loading embeddings")
-        print("[RAG] Loading embeddings model…")
-        self.embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-        print("[RAG] Embeddings loaded")
-        logger.info("Embeddings loaded")
-
-        # Vectorstore / Chroma
-        print(f"[RAG] Loading Chroma DB from: {VECTORSTORE_PATH}")
-        self.vectorstore = Chroma(
-            persist_directory=VECTORSTORE_PATH,
-            embedding_function=self.embeddings,
-            collection_name="company_docs",
-        )
-        print("[RAG] Chroma loaded")
-        logger.info("Chroma loaded")
-
-        # Retriever with metadata filter
-        print(f"[RAG] Creating retriever for role={role}")
-        self.retriever = self.vectorstore.as_retriever(
-            search_kwargs={
-                "k": self.k,
-                "filter": {"role": self.role},
-            }
-        )
-        print("[RAG] Retriever created")
-        logger.info("Retriever created")
-
-        # HF LLM pipeline
-        print(f"[RAG] Loading LLM: {HF_LLM_MODEL}")
-        # device=-1 uses CPU; if you want to use GPU set device=0 (and ensure model fits)
-        self.llm_pipeline = pipeline(
-            "text2text-generation",
-            model=HF_LLM_MODEL,
-            max_length=512,  # generation max; keep reasonably small
-            do_sample=False,
-            device=-1,
+        # Shared models: loaded once per process by the registry, so building
+        # a chain per role is cheap after the first request.
+        registry = get_registry()
+        self.embeddings = registry.get_embeddings()
+        self.query_embedder = registry.get_query_embedder()
+        self.vectorstore = registry.get_vectorstore()
+        self.llm_pipeline = registry.get_llm_pipeline()
+        self.batcher = registry.get_generation_batcher()
+        self.answer_cache = get_answer_cache()
+        self.lexical = registry.get_lexical_store() if RAG_HYBRID else None
+        self.token_counter = registry.get_token_counter()
+        self.reranker = registry.get_reranker()
+        logger.debug("Shared models attached")
+
+        # One metadata filter spanning every collection the role is granted
+        self.search_filter = retrieval_filter(self.role)
+
+        # Partitioned layout: the role's granted label collections, searched unfiltered
+        self.labels = allowed_labels(self.role)
+        self.partitions = (
+            [registry.get_vectorstore(label) for label in self.labels]
+            if is_partitioned() else []
         )
-        print("[RAG] HF pipeline loaded successfully")
-        logger.info("HF pipeline loaded")
 
         # System / template text (we will format into a single string)
         self.system_header = (
@@ -84,53 +87,169 @@ class RAGChain:
             "Answer:"
         )
 
-        print("[RAG] LCEL built (simple explicit flow)")
+        logger.info("RAG chain ready", extra={"role": role, "labels": list(self.labels)})
 
-    def _build_prompt(self, docs: List, question: str) -> str:
+    def _build_prompt(self, docs: List, question: str):
         """
-        Join docs into a single context string and return full prompt text.
-        Truncates context if too long to avoid Transformer errors.
+        Join docs (best first) into a context that fits the model's input
+        budget and return (prompt text, context info).
         """
-        # docs are Document-like with page_content attribute
-        pieces = []
-        for d in docs:
-            content = getattr(d, "page_content", None)
-            if not content:
+        texts = [getattr(d, "page_content", None) for d in docs]
+
+        if self.token_counter is None:
+            return self._build_prompt_chars(texts, question)
+
+        # tokens left for context once the fixed template and question are in
+        empty_prompt = self.system_header.format(role=self.role, context="", question=question)
+        budget = MAX_INPUT_TOKENS - self.token_counter.count(empty_prompt) - 1  # </s>
+        pieces, info = assemble_context(texts, self.token_counter, max(budget, 0))
+
+        context = CONTEXT_SEPARATOR.join(pieces).strip() or "No context available."
+        prompt = self.system_header.format(role=self.role, context=context, question=question)
+        return prompt, info
+
+    def _build_prompt_chars(self, texts, question: str):
+        # only chunks whose text (at least partly) lands before the cut are reported as used
+        pieces, used_indices, length, truncated = [], [], 0, False
+        for i, t in enumerate(texts):
+            if not t or not t.strip():
                 continue
-            # include a small marker and truncated snippet per doc to keep prompt smaller
-            pieces.append(content.strip())
+            start = length + (len(CONTEXT_SEPARATOR) if pieces else 0)
+            if start >= MAX_CONTEXT_CHARS:
+                truncated = True
+                break
+            pieces.append(t.strip())
+            used_indices.append(i)
+            length = start + len(pieces[-1])
 
-        context = "\n\n---\n\n".join(pieces).strip()
+        context = CONTEXT_SEPARATOR.join(pieces).strip()
         if not context:
             context = "No context available."
-
-        # If context too large, truncate (keep the end or start as you prefer)
-        if len(context) > MAX_CONTEXT_CHARS:
+        elif truncated or len(context) > MAX_CONTEXT_CHARS:
             logger.warning("Context too long; truncating to %d chars", MAX_CONTEXT_CHARS)
             context = context[:MAX_CONTEXT_CHARS] + "\n\n[...context truncated...]"
 
         prompt = self.system_header.format(role=self.role, context=context, question=question)
-        return prompt
+        return prompt, {"chars_used": len(context), "chunks_used": len(pieces), "used_indices": used_indices}
 
-    def invoke(self, question: str) -> str:
+    def embed_query(self, question: str):
+        """
+        Embed the question once; the vector is reused for cache lookup and search.
+        Served from the shared query LRU, or batched with concurrent requests.
+        """
+        return self.query_embedder.embed(question)
+
+    def retrieve(self, question: str, query_vec=None, k: int = None):
         """
-        High-level call used by api.py. Returns the generated answer string.
+        Single retrieval pass. Returns the top k (default self.k) as
+        (docs, scores), one dict per doc: "score" is always the dense
+        relevance score in [0, 1] (higher is more similar); when hybrid BM25 +
+        dense retrieval ranked the results, "rrf_score" carries the reciprocal
+        rank fusion score they are ordered by. Pass query_vec to skip
+        re-embedding the question.
         """
+        k = k or self.k
         try:
-            # get relevant docs via retriever.invoke (LangChain retriever runnable)
-            # retriever.invoke returns a list of Document objects
-            docs = self.retriever.invoke(question)
-        except Exception as e:
+            if query_vec is None:
+                query_vec = self.embed_query(question)
+            pool = k * HYBRID_POOL_FACTOR if self.lexical is not None else k
+            dense = self._dense_search(query_vec, pool)
+            lexical = self.lexical.search(self.labels, question, pool) if self.lexical is not None else []
+        except Exception:
             # log and re-raise so api.py can catch
             logger.exception("Retriever invoke failed")
             raise
 
-        # build final prompt string
-        prompt_text = self._build_prompt(docs, question)
+        if not lexical:
+            dense = dense[:k]
+            return [d for d, _ in dense], [{"score": s} for _, s in dense]
+
+        by_id = {self._doc_id(d): (d, s) for d, s in dense}
+        fused = reciprocal_rank_fusion(
+            [[self._doc_id(d) for d, _ in dense], [cid for cid, _ in lexical]], k
+        )
+        missing = [cid for cid, _ in fused if cid not in by_id]
+        if missing:
+            by_id.update(self._get_by_ids(query_vec, missing))
+
+        results = [(by_id[cid], rrf) for cid, rrf in fused if cid in by_id]
+        return [d for (d, _), _ in results], [{"score": s, "rrf_score": rrf} for (_, s), rrf in results]
+
+    def select(self, question: str, query_vec, timings: dict):
+        """
+        Retrieval plus optional cross-encoder re-ranking: fetches a larger
+        candidate pool when a re-ranker is configured and keeps the best k,
+        adding each doc's "rerank_score" to its scores. Records "retrieve"
+        and "rerank" in timings.
+        """
+        pool = max(RERANK_POOL, self.k) if self.reranker is not None else self.k
+
+        t0 = time.perf_counter()
+        docs, scores = self.retrieve(question, query_vec=query_vec, k=pool)
+        timings["retrieve"] = time.perf_counter() - t0
+
+        if self.reranker is not None:
+            t0 = time.perf_counter()
+            by_doc = {id(d): s for d, s in zip(docs, scores)}
+            docs, rerank_scores = self.reranker.rerank(question, docs, self.k)
+            scores = [{**by_doc[id(d)], "rerank_score": r} for d, r in zip(docs, rerank_scores)]
+            timings["rerank"] = time.perf_counter() - t0
+
+        return docs, scores
+
+    def _dense_search(self, query_vec, k: int):
+        if self.partitions:
+            results = []
+            for store in self.partitions:
+                results.extend(self._search(store, query_vec, None, k))
+            # merge the per-partition top-k lists
+            results.sort(key=lambda r: r[1], reverse=True)
+            return results[:k]
+        return self._search(self.vectorstore, query_vec, self.search_filter, k)
+
+    @staticmethod
+    def _doc_id(doc):
+        # Chroma fills Document.id; older ingests only have it in metadata
+        return getattr(doc, "id", None) or doc.metadata.get("chunk_id")
+
+    def _get_by_ids(self, query_vec, ids):
+        """
+        Fetches lexical-only hits from the role's own collection(s), with
+        their dense relevance scores (a vector query restricted to ids).
+        """
+        found = {}
+        for store in self.partitions or [self.vectorstore]:
+            search_filter = None if self.partitions else self.search_filter
+            for doc, score in self._search(store, query_vec, search_filter, len(ids), ids=ids):
+                # defence in depth: never return a chunk outside the role's grants
+                if doc.metadata.get("role") in self.labels:
+                    found[self._doc_id(doc)] = (doc, score)
+        return found
+
+    def _search(self, store, query_vec, search_filter, k: int, **kwargs):
+        results = store.similarity_search_by_vector_with_relevance_scores(
+            query_vec, k=k, filter=search_filter, **kwargs
+        )
+        # Chroma returns distances here; convert to relevance like similarity_search_with_relevance_scores
+        relevance_fn = store._select_relevance_score_fn()
+        return [(d, float(relevance_fn(s))) for d, s in results]
+
+    def generate(self, prompt_text: str) -> str:
+        """
+        Run the HF pipeline on a single prompt and return the answer text.
+        With batching enabled the prompt is queued and generated together
+        with other concurrent prompts.
+        """
+        if self.batcher is not None:
+            try:
+                return self.batcher.generate(prompt_text)
+            except Exception:
+                logger.exception("Batched LLM generation failed")
+                raise
 
         # IMPORTANT: transformers pipeline expects str (or list[str])
         try:
-            output = self.llm_pipeline(prompt_text, max_length=300)  # returns list of dicts
+            output = self.llm_pipeline(prompt_text, max_length=GEN_MAX_LENGTH)  # returns list of dicts
             if isinstance(output, list) and len(output) > 0:
                 # different HF versions use different keys: prefer generated_text then text
                 first = output[0]
@@ -142,3 +261,184 @@ class RAGChain:
             raise
 
         return answer
+
+    def run(self, question: str) -> dict:
+        """
+        Retrieve, build prompt and generate in one pass.
+        Returns {"answer", "docs", "scores", "timings", "context", "cached",
+        "tokens_generated"}; docs are exactly the documents placed in the prompt
+        and scores their per-doc score dicts (see retrieve/select),
+        timings are per-stage seconds and context reports the token budget used. Similar
+        questions from the same role are served from the semantic answer cache.
+        """
+        timings = {}
+
+        t0 = time.perf_counter()
+        query_vec = self.embed_query(question)
+        timings["embed"] = time.perf_counter() - t0
+
+        if self.answer_cache is not None:
+            t0 = time.perf_counter()
+            cached = self.answer_cache.lookup(self.role, query_vec)
+            timings["cache"] = time.perf_counter() - t0
+            if cached is not None:
+                timings["total"] = sum(timings.values())
+                return {**cached, "timings": timings, "cached": True, "tokens_generated": 0}
+
+        docs, scores = self.select(question, query_vec, timings)
+
+        t0 = time.perf_counter()
+        prompt_text, context_info = self._build_prompt(docs, question)
+        timings["prompt"] = time.perf_counter() - t0
+
+        # keep only the chunks that made it into the prompt
+        used = context_info.pop("used_indices")
+        docs = [docs[i] for i in used]
+        scores = [scores[i] for i in used]
+
+        t0 = time.perf_counter()
+        answer = self.generate(prompt_text)
+        timings["generate"] = time.perf_counter() - t0
+
+        result = {"answer": answer, "docs": docs, "scores": scores}
+        if self.answer_cache is not None:
+            self.answer_cache.store(self.role, query_vec, result)
+
+        timings["total"] = sum(timings.values())
+        return {
+            **result,
+            "timings": timings,
+            "context": context_info,
+            "cached": False,
+            "tokens_generated": self._count_tokens(answer),
+        }
+
+    def _count_tokens(self, text: str) -> int:
+        return self.token_counter.count(text) if self.token_counter is not None and text else 0
+
+    def stream(self, question: str, stop_event=None):
+        """
+        Streaming variant of run(). Yields events as dicts:
+          {"event": "sources", "docs": [...], "scores": [...]}  (first)
+          {"event": "token", "text": "..."}                    (as generated)
+          {"event": "done", "timings": {...}, "tokens_generated": n}
+        Generation stops early if stop_event is set.
+        """
+        timings = {}
+
+        docs, scores = self.select(question, None, timings)
+
+        t0 = time.perf_counter()
+        prompt_text, context_info = self._build_prompt(docs, question)
+        timings["prompt"] = time.perf_counter() - t0
+
+        used = context_info.pop("used_indices")
+        yield {"event": "sources", "docs": [docs[i] for i in used], "scores": [scores[i] for i in used]}
+
+        # streaming needs token-level callbacks, so we bypass the pipeline/batcher
+        # and drive model.generate() directly with a streamer
+        tokenizer = self.llm_pipeline.tokenizer
+        model = self.llm_pipeline.model
+        inputs = tokenizer(prompt_text, return_tensors="pt", truncation=True, max_length=MAX_INPUT_TOKENS)
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+        gen_kwargs = dict(**inputs, streamer=streamer, max_length=GEN_MAX_LENGTH, do_sample=False)
+        if stop_event is not None:
+            gen_kwargs["stopping_criteria"] = StoppingCriteriaList([_StopOnEvent(stop_event)])
+
+        t0 = time.perf_counter()
+        errors = []
+
+        def _generate():
+            try:
+                model.generate(**gen_kwargs)
+            except Exception as e:
+                logger.exception("Streaming generation failed")
+                errors.append(e)
+                streamer.end()
+
+        gen_thread = threading.Thread(target=_generate, name="rag-stream-gen", daemon=True)
+        gen_thread.start()
+
+        first_token = None
+        pieces = []
+        for text in streamer:
+            if not text:
+                continue
+            if first_token is None:
+                first_token = time.perf_counter() - t0
+            pieces.append(text)
+            yield {"event": "token", "text": text}
+        gen_thread.join()
+
+        if errors:
+            raise errors[0]
+
+        timings["first_token"] = first_token if first_token is not None else 0.0
+        timings["generate"] = time.perf_counter() - t0
+        timings["total"] = sum(v for name, v in timings.items() if name != "first_token")
+        yield {"event": "done", "timings": timings, "tokens_generated": self._count_tokens("".join(pieces))}
+
+    def invoke(self, question: str) -> str:
+        """
+        High-level call returning only the generated answer string.
+        """
+        result = self.run(question)
+        record_stages(self.role, result["timings"], endpoint="invoke")
+        return result["answer"]
+
+
+_chains = {}
+_chains_lock = threading.Lock()
+
+
+def get_rag_chain(role: str, k: int = 4) -> RAGChain:
+    """
+    Returns the cached RAGChain for (role, k), building it on first use.
+    """
+    key = (role, k)
+    chain = _chains.get(key)
+    if chain is None:
+        with _chains_lock:
+            chain = _chains.get(key)
+            if chain is None:
+                chain = RAGChain(role, k=k)
+                _chains[key] = chain
+    return chain
+
+
+def _drop_chains(role: str = None):
+    """Chains capture the role's filter and partitions; rebuild them when grants change."""
+    with _chains_lock:
+        for key in [key for key in _chains if role is None or key[0] == role]:
+            del _chains[key]
+
+
+on_grants_changed(_drop_chains)
+
+
+def run_rag_query(role: str, question: str, submitted_at: float = None) -> dict:
+    """
+    Module-level entry point for worker pools (picklable for process pools).
+    submitted_at (time.time() at submit) adds the pool wait as timings["queue_wait"].
+    """
+    queue_wait = time.time() - submitted_at if submitted_at is not None else None
+    with profile_request("rag_query", role=role):
+        result = get_rag_chain(role).run(question)
+    if queue_wait is not None:
+        result["timings"]["queue_wait"] = queue_wait
+    return result
+
+
+def stream_rag_query(role: str, question: str, emit, stop_event=None, submitted_at: float = None):
+    """
+    Worker-pool entry point for streaming: pushes every stream() event to emit().
+    """
+    queue_wait = time.time() - submitted_at if submitted_at is not None else None
+    with profile_request("rag_query_stream", role=role):
+        for event in get_rag_chain(role).stream(question, stop_event=stop_event):
+            if stop_event is not None and stop_event.is_set():
+                break
+            if event["event"] == "done" and queue_wait is not None:
+                event["timings"]["queue_wait"] = queue_wait
+            emit(event)
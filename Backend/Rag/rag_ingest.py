@@ -1,22 +1,207 @@
 # Backend/Rag/rag_ingest.py
 
-from Backend.Rag.loader import load_documents
+import os
+import sys
+import json
+import hashlib
+
+from Backend.Rag.loader import iter_pdf_files, iter_file_chunks
 from Backend.Rag.embedder import get_embedder
-from Backend.Rag.vector_store import get_vectorstore
+from Backend.Rag.embedding_stage import EmbeddingStage, clear_checkpoint
+from Backend.Rag.vector_store import (
+    get_vectorstore, bump_corpus_versions, collection_name_for, is_partitioned, INDEX_LAYOUT, VECTOR_DIR,
+)
+from Backend.Rag.lexical_index import build_from_vectorstore, has_index
+
+DATA_DIR = "./data"
+MANIFEST_PATH = os.path.join(VECTOR_DIR, "ingest_manifest.json")
+CHECKPOINT_PATH = os.path.join(VECTOR_DIR, "ingest_checkpoint.jsonl")
+
+
+# -----------------------------
+# Hashing / manifest helpers
+# -----------------------------
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_ids(source: str, chunks) -> list:
+    """
+    Deterministic chunk IDs: hash(source) + hash(content), with an occurrence
+    suffix so identical chunks inside one file stay distinct.
+    """
+    src = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+    seen = {}
+    ids = []
+    for c in chunks:
+        content = hashlib.sha256(c.page_content.encode("utf-8")).hexdigest()[:32]
+        n = seen.get(content, 0)
+        seen[content] = n + 1
+        ids.append(f"{src}-{content}-{n}")
+    return ids
+
+
+def load_manifest() -> dict:
+    try:
+        with open(MANIFEST_PATH, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {"files": {}, "layout": INDEX_LAYOUT}
 
-def ingest_documents():
+
+def save_manifest(manifest: dict):
+    os.makedirs(VECTOR_DIR, exist_ok=True)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_PATH)
+
+
+# -----------------------------
+# Ingestion
+# -----------------------------
+def ingest_documents(base_dir: str = DATA_DIR, full: bool = False, embeddings=None):
+    """
+    Incremental ingestion. Only new/changed files are parsed, only chunks whose
+    content hash is new are embedded, and vectors of removed files or removed
+    chunks are deleted. Pass full=True to re-parse and re-upsert every file.
+    embeddings defaults to get_embedder().
+
+    The manifest records RAG_INDEX_LAYOUT. When it changes, every chunk is
+    deleted from the old layout's collections and every file is re-ingested
+    into the new layout (vectors come back from the embedding cache).
+
+    Changed files are parsed in parallel (see loader.iter_file_chunks) and
+    their chunks flow into a pipelined embedding stage (embedding_stage.py)
+    as they arrive, so the corpus is never held in memory at once. An
+    interrupted run resumes from the stage's checkpoint.
+    """
     print("🚀 Starting ingestion...")
 
-    docs = load_documents("./data")
-    print(f"Loaded {len(docs)} chunked docs.")
+    manifest = load_manifest()
+    old_files = manifest.get("files", {})
+    # manifests written before the layout was recorded come from the shared layout
+    old_layout = manifest.get("layout", "shared")
+    new_files = {}
+    changed_roles = set()
+    to_delete = {}  # role label -> chunk ids, in old_layout's collections
+
+    current = dict(iter_pdf_files(base_dir))
+
+    if old_layout != INDEX_LAYOUT:
+        # layout switch: the new collections start empty, so nothing is reusable
+        print(f"[INGEST] Index layout changed ({old_layout} -> {INDEX_LAYOUT}), re-ingesting everything")
+        for entry in old_files.values():
+            to_delete.setdefault(entry["role"], []).extend(entry["chunk_ids"])
+            changed_roles.add(entry["role"])
+        old_files = {}
+
+    # removed files: drop all their vectors
+    for path, entry in old_files.items():
+        if path not in current:
+            print(f"[INGEST] Removed: {path}")
+            to_delete.setdefault(entry["role"], []).extend(entry["chunk_ids"])
+            changed_roles.add(entry["role"])
 
-    embeddings = get_embedder()
-    vectorstore = get_vectorstore(embeddings)
+    to_parse = []
+    for path, role in current.items():
+        digest = file_hash(path)
+        entry = old_files.get(path)
+        if not full and entry and entry["file_hash"] == digest and entry["role"] == role:
+            new_files[path] = entry
+        else:
+            to_parse.append((path, role, digest))
+
+    print(f"[INGEST] {len(to_parse)} new/changed files, {len(old_files.keys() - current.keys())} removed")
+
+    # labels that have chunks but no BM25 index yet (e.g. first run after upgrading)
+    missing_lexical = {e["role"] for e in new_files.values() if not has_index(e["role"])}
+
+    if not to_parse and not to_delete and not missing_lexical:
+        print("✅ Nothing changed, ingestion skipped.")
+        return None
+
+    embeddings = embeddings or get_embedder()
+    stores = {}
+
+    def store_for_label(label, layout=None):
+        # one shared collection, or one per role label when RAG_INDEX_LAYOUT=partitioned
+        name = collection_name_for(label, layout)
+        if name not in stores:
+            stores[name] = get_vectorstore(embeddings, label, layout)
+        return stores[name]
+
+    deleted = 0
+    if to_delete:
+        print("Deleting stale chunks from ChromaDB...")
+        for label, ids in to_delete.items():
+            # from the layout that wrote them, which is not the current one after a switch
+            store_for_label(label, old_layout).delete(ids=ids)
+            deleted += len(ids)
+
+    digests = {path: digest for path, _, digest in to_parse}
+    stage = EmbeddingStage(embeddings, store_for_label, checkpoint_path=CHECKPOINT_PATH)
 
     print("Adding documents to ChromaDB...")
-    vectorstore.add_documents(docs)
+    for path, role, chunks in iter_file_chunks((p, r) for p, r, _ in to_parse):
+        entry = old_files.get(path)
+        ids = chunk_ids(path, chunks)
+        old_ids = set(entry["chunk_ids"]) if entry else set()
+
+        # chunks whose vectors can be reused as-is (same content, same role metadata)
+        reusable = old_ids if (entry and not full and entry["role"] == role) else set()
+        if entry and entry["role"] != role:
+            # moved to another label: its old vectors live under the old label
+            changed_roles.add(entry["role"])
+            stale = list(old_ids)
+        else:
+            stale = list(old_ids - set(ids))
+        # delete before queueing new vectors so a re-upserted id is never removed afterwards
+        if stale:
+            store_for_label(entry["role"], old_layout).delete(ids=stale)
+            deleted += len(stale)
 
+        new_docs, new_ids = [], []
+        for c, cid in zip(chunks, ids):
+            if cid not in reusable:
+                c.metadata["chunk_id"] = cid
+                new_docs.append(c)
+                new_ids.append(cid)
+        stage.add(new_docs, new_ids)
+
+        new_files[path] = {"file_hash": digests[path], "role": role, "chunk_ids": ids}
+        changed_roles.add(role)
+
+    stats = stage.close()
+
+    # files that failed to parse keep their previous manifest entry (retried next run)
+    for path, _, _ in to_parse:
+        if path not in new_files and path in old_files:
+            new_files[path] = old_files[path]
+
+    save_manifest({"files": new_files, "layout": INDEX_LAYOUT})
+    clear_checkpoint(CHECKPOINT_PATH)
+
+    # rebuild the BM25 index of every label whose chunks changed
+    for label in sorted(changed_roles | missing_lexical):
+        search_filter = None if is_partitioned() else {"role": label}
+        build_from_vectorstore(label, store_for_label(label), search_filter=search_filter)
+
+    # invalidate cached answers for every role whose documents changed
+    bump_corpus_versions(changed_roles)
+
+    print(f"[INGEST] Embedded {stats['chunks']} chunks, deleted {deleted} stale chunks")
+    print(f"[INGEST] Throughput: {stats['chunks_per_second']} chunks/s "
+          f"(embed {stats['embed_seconds']}s, write {stats['write_seconds']}s, batch={stats['batch_size']})")
     print("✅ Ingestion completed!")
+    return stats
+
 
 if __name__ == "__main__":
-    ingest_documents()
+    from Backend.logging_config import configure_logging
+    configure_logging()
+    ingest_documents(full="--full" in sys.argv)
@@ -0,0 +1,56 @@
+# Backend/Rag/reranker.py
+"""
+Optional cross-encoder re-ranking stage.
+
+The retriever fetches a larger candidate pool, the cross-encoder scores every
+(question, chunk) pair in batches, and only the best few go to the prompt.
+"""
+import os
+import time
+import logging
+
+logger = logging.getLogger("rag_reranker")
+
+RERANK_ENABLED = os.getenv("RAG_RERANK", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# candidates fetched from retrieval before re-ranking
+RERANK_POOL = int(os.getenv("RAG_RERANK_POOL", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RAG_RERANK_BATCH", "16"))
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name: str = RERANK_MODEL, batch_size: int = RERANK_BATCH_SIZE):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+        self.calls = 0
+        self.pairs_scored = 0
+        self.seconds = 0.0
+
+    def rerank(self, question: str, docs, top_n: int):
+        """Returns (docs, scores) of the top_n candidates by cross-encoder score."""
+        if not docs:
+            return [], []
+
+        t0 = time.perf_counter()
+        pairs = [(question, d.page_content) for d in docs]
+        scores = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        elapsed = time.perf_counter() - t0
+
+        self.calls += 1
+        self.pairs_scored += len(pairs)
+        self.seconds += elapsed
+
+        ranked = sorted(zip(docs, (float(s) for s in scores)), key=lambda r: r[1], reverse=True)[:top_n]
+        return [d for d, _ in ranked], [s for _, s in ranked]
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "calls": self.calls,
+            "pairs_scored": self.pairs_scored,
+            "avg_ms": round(1000 * self.seconds / self.calls, 2) if self.calls else 0.0,
+        }
@@ -1,15 +1,69 @@
 
 import os
+import json
+import time
+import logging
 from langchain_chroma import Chroma
 
-VECTOR_DIR = "./Backend/Rag/chroma_index"
+logger = logging.getLogger("rag_vector_store")
 
-def get_vectorstore(embeddings):
-    print(f"[VECTOR] Initializing Chroma at {VECTOR_DIR}")
+VECTOR_DIR = os.getenv("CHROMA_PERSIST_DIR", "./Backend/Rag/chroma_index")
+CORPUS_VERSIONS_FILE = os.path.join(VECTOR_DIR, "corpus_versions.json")
+COLLECTION_NAME = "company_docs"
+
+# "shared": one collection, role isolation by metadata filter at query time
+# "partitioned": one collection per role label, searched without a filter
+INDEX_LAYOUT = os.getenv("RAG_INDEX_LAYOUT", "shared")
+
+
+def is_partitioned() -> bool:
+    return INDEX_LAYOUT == "partitioned"
+
+
+def collection_name_for(label: str = None, layout: str = None) -> str:
+    """
+    Collection holding chunks with the given role label (shared layout ignores it).
+    layout defaults to RAG_INDEX_LAYOUT; ingestion passes the layout that wrote old chunks.
+    """
+    if label is None or (layout or INDEX_LAYOUT) != "partitioned":
+        return COLLECTION_NAME
+    return f"{COLLECTION_NAME}__{label.lower()}"
+
+
+def get_vectorstore(embeddings, label: str = None, layout: str = None):
+    name = collection_name_for(label, layout)
+    logger.info("Initializing Chroma", extra={"path": VECTOR_DIR, "collection": name})
     os.makedirs(VECTOR_DIR, exist_ok=True)
 
     return Chroma(
-        collection_name="company_docs",
+        collection_name=name,
         persist_directory=VECTOR_DIR,
         embedding_function=embeddings
     )
+
+
+def read_corpus_versions() -> dict:
+    """
+    role -> version stamp of the documents visible to that role.
+    Written by ingestion, read by caches that must drop stale answers.
+    """
+    try:
+        with open(CORPUS_VERSIONS_FILE, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def bump_corpus_versions(roles):
+    """Mark the documents of the given roles as changed."""
+    versions = read_corpus_versions()
+    stamp = time.time()
+    for role in roles:
+        versions[role] = stamp
+
+    os.makedirs(VECTOR_DIR, exist_ok=True)
+    tmp = CORPUS_VERSIONS_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(versions, f)
+    os.replace(tmp, CORPUS_VERSIONS_FILE)
+    return versions
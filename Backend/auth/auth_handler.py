@@ -11,9 +11,18 @@ jwt_secret_key = os.getenv("JWT_SECRET_KEY", "your_default_secret_key")
 jwt_algorithm ="HS256"
 access_token_exp = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# argon2 cost (passlib defaults). Stored hashes made with other parameters
+# still verify and are rehashed with these on the next successful login.
+argon2_time_cost = int(os.getenv("ARGON2_TIME_COST", "3"))
+argon2_memory_kib = int(os.getenv("ARGON2_MEMORY_KIB", "65536"))
+argon2_parallelism = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
 pwd_context = CryptContext(
     schemes=["argon2"],
     deprecated="auto",
+    argon2__rounds=argon2_time_cost,
+    argon2__memory_cost=argon2_memory_kib,
+    argon2__parallelism=argon2_parallelism,
 )
 
 def get_password_hash(password: str):
@@ -22,6 +31,10 @@ def get_password_hash(password: str):
 def verify_password(password: str, hashed: str):
     return pwd_context.verify(password, hashed)
 
+def verify_and_update_password(password: str, hashed: str):
+    """(valid, new_hash); new_hash is set when the stored hash uses outdated cost parameters."""
+    return pwd_context.verify_and_update(password, hashed)
+
 def create_access_token(subject: str, role: str, expires_delta: Optional[timedelta] = None) -> str:
     expire = datetime.now(timezone.utc) + (expires_delta if expires_delta else timedelta(minutes=access_token_exp))
     payload = {"exp": expire, "sub": str(subject), "role": role}
@@ -0,0 +1,96 @@
+# Backend/auth/password_hasher.py
+"""
+Dedicated, bounded executor for argon2 work.
+
+Hashing and verification run on AUTH_HASH_WORKERS threads of their own
+(argon2 releases the GIL), so a login storm queues here instead of
+occupying the threadpool that serves the rest of the API. Admission is
+bounded: past AUTH_HASH_MAX_PENDING queued or running jobs, callers get
+HashQueueFull and the route answers 503 with Retry-After.
+"""
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from Backend.metrics import get_metrics
+from .auth_handler import get_password_hash, verify_and_update_password
+
+HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.getenv("AUTH_HASH_MAX_PENDING", "64"))
+HASH_RETRY_AFTER = int(os.getenv("AUTH_HASH_RETRY_AFTER", "2"))
+
+_metrics = get_metrics()
+_metrics.describe("auth_hash_seconds", "argon2 hash/verify time on the hashing executor")
+_metrics.describe("auth_hash_queue_seconds", "Time a hash/verify job waited for a hashing thread")
+
+
+class HashQueueFull(Exception):
+    def __init__(self, retry_after: int = HASH_RETRY_AFTER):
+        super().__init__("password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    def _timed(self, op, fn, submitted, *args):
+        started = time.perf_counter()
+        _metrics.observe("auth_hash_queue_seconds", started - submitted, op=op)
+        try:
+            return fn(*args)
+        finally:
+            _metrics.observe("auth_hash_seconds", time.perf_counter() - started, op=op)
+
+    async def _run(self, op, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                _metrics.inc("auth_hash_rejected_total", op=op)
+                raise HashQueueFull()
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._timed, op, fn, time.perf_counter(), *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_password_hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str):
+        """(valid, new_hash or None) — see auth_handler.verify_and_update_password."""
+        return await self._run("verify", verify_and_update_password, password, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher()
+                _metrics.gauge("auth_hash_pending", lambda: _hasher._pending)
+    return _hasher
@@ -0,0 +1,418 @@
+# Backend/auth/permission_matrix.py
+"""
+Compiled, in-memory RBAC permission matrix.
+
+Built from models.Role / models.Permission / role_permission in three
+queries. Every permission gets a bit, and every role compiles to an immutable
+RoleGrants: its permission bitmask and names, the document collections it
+grants, and the retrieval labels and Chroma filter derived from those. An
+authorization check is a dict lookup plus a bit test.
+
+The roles/permissions routes report each committed change (role_created,
+assigned, permission_deleted, ...) and only the affected roles recompile;
+grant listeners are then notified through role_assigner.invalidate_role_grants.
+Other worker processes pick changes up on their next periodic reload
+(RBAC_MATRIX_REFRESH seconds, 0 disables).
+
+The database is the single source of document grants. roles_config.json
+only seeds a database that has no permissions yet (seed_role_grants, run
+at startup); the matrix is compiled from that config only while the RBAC
+tables are missing or unreachable.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import select, insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from Backend.Database.connections import SessionLocal
+from Backend.Database import models
+
+logger = logging.getLogger("rbac")
+
+RBAC_MATRIX_REFRESH = float(os.getenv("RBAC_MATRIX_REFRESH", "30"))  # seconds
+ROLES_CONFIG_PATH = os.getenv("ROLES_CONFIG_PATH", "backend/auth/roles_config.json")
+
+DEFAULT_ROLES = {
+    "Finance": ["finance_docs", "general_docs"],
+    "Marketing": ["marketing_docs", "general_docs"],
+    "HR": ["hr_docs", "general_docs"],
+    "Engineering": ["engineering_docs", "general_docs"],
+    "C_Level": ["finance_docs", "marketing_docs", "hr_docs", "engineering_docs", "c_level_docs", "general_docs"],
+    "Employee": ["general_docs"]
+}
+
+# Document collection -> chunk `role` metadata labels written by Rag/loader.normalize_role
+DOC_COLLECTION_LABELS = {
+    "finance_docs": ["Finance"],
+    "marketing_docs": ["Marketing"],
+    "hr_docs": ["HR"],
+    "engineering_docs": ["Engineering"],
+    "c_level_docs": ["Management"],
+    "general_docs": ["General", "Employee"],
+}
+
+
+def load_roles_config() -> dict:
+    try:
+        with open(ROLES_CONFIG_PATH, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return DEFAULT_ROLES
+
+
+@dataclass(frozen=True)
+class RoleGrants:
+    id: Optional[int]
+    name: str
+    mask: int  # bit per permission, see PermissionMatrix._bits
+    permissions: frozenset
+    documents: tuple  # granted document collections (permissions named in DOC_COLLECTION_LABELS)
+    labels: tuple  # chunk role labels those collections cover
+    search_filter: dict  # Chroma metadata filter over `labels`; treat as read-only
+
+
+def _compile_role(role_id, name, permission_names, mask) -> RoleGrants:
+    names = sorted(permission_names)
+    documents = tuple(p for p in names if p in DOC_COLLECTION_LABELS)
+    labels = []
+    for collection in documents:
+        for label in DOC_COLLECTION_LABELS[collection]:
+            if label not in labels:
+                labels.append(label)
+    # roles without document grants only see chunks labelled with their own name
+    labels = tuple(labels) if labels else (name,)
+    search_filter = {"role": labels[0]} if len(labels) == 1 else {"role": {"$in": list(labels)}}
+    return RoleGrants(role_id, name, mask, frozenset(names), documents, labels, search_filter)
+
+
+@lru_cache(maxsize=1024)
+def _ungranted(name: str) -> RoleGrants:
+    """Grants of a role name the matrix does not know (e.g. a token minted before the role was deleted)."""
+    return _compile_role(None, name, (), 0)
+
+
+def _config_rows(config: dict):
+    """(roles, permissions, links) rows with synthetic negative ids, shaped like the SQL result."""
+    role_ids = {name: -(i + 1) for i, name in enumerate(config)}
+    permission_ids = {}
+    for grants in config.values():
+        for name in grants:
+            permission_ids.setdefault(name, -(len(permission_ids) + 1))
+    links = [(role_ids[r], permission_ids[p]) for r, grants in config.items() for p in grants]
+    roles = [(rid, name) for name, rid in role_ids.items()]
+    permissions = [(pid, name) for name, pid in permission_ids.items()]
+    return roles, permissions, links
+
+
+class PermissionMatrix:
+    def __init__(self, refresh: float = RBAC_MATRIX_REFRESH):
+        self.refresh = refresh
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._roles = {}  # role name -> RoleGrants
+        self._role_names = {}  # role id -> name
+        self._permissions = {}  # permission name -> id
+        self._permission_names = {}  # permission id -> name
+        self._bits = {}  # permission id -> bit index
+        self._free_bits = []
+        self._links = {}  # role id -> set of permission ids
+        self._loaded_at = None
+        # every load and incremental update takes a sequence number; a load
+        # only installs if nothing newer was applied while it was querying
+        self._sequence = 0
+        self._applied = 0
+        self.source = None  # "database" or "config"
+        self.reloads = 0
+        self.updates = 0
+        self.stale_loads = 0
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def role(self, name: str) -> RoleGrants:
+        self._maybe_refresh()
+        grants = self._roles.get(name)
+        return grants if grants is not None else _ungranted(name)
+
+    def has_permission(self, role: str, permission: str) -> bool:
+        grants = self.role(role)
+        bit = self._bits.get(self._permissions.get(permission))
+        return bit is not None and bool(grants.mask >> bit & 1)
+
+    def is_assigned(self, role_id: int, permission_id: int) -> bool:
+        self._maybe_refresh()
+        name = self._role_names.get(role_id)
+        bit = self._bits.get(permission_id)
+        if name is None or bit is None:
+            return False
+        return bool(self._roles[name].mask >> bit & 1)
+
+    def _maybe_refresh(self):
+        if self._loaded_at is None:
+            with self._reload_lock:
+                if self._loaded_at is None:
+                    self.load()
+        elif self.refresh > 0 and time.monotonic() - self._loaded_at > self.refresh:
+            # one thread reloads; the others keep serving the current matrix
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self.load()
+                finally:
+                    self._reload_lock.release()
+
+    # -----------------------------
+    # Full build
+    # -----------------------------
+    def load(self, db=None):
+        """Rebuild from the database; roles whose grants changed are invalidated."""
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        rows, source = None, "database"
+        session = db if db is not None else SessionLocal()
+        try:
+            roles = session.execute(select(models.Role.id, models.Role.name)).all()
+            permissions = session.execute(select(models.Permission.id, models.Permission.name)).all()
+            links = session.execute(
+                select(models.role_permission.c.role_id, models.role_permission.c.permission_id)
+            ).all()
+            # an empty link table is a valid state (every grant revoked), not "unseeded"
+            rows = (roles, permissions, links)
+        except SQLAlchemyError as e:
+            logger.warning("RBAC tables unavailable, using roles config", extra={"error": str(e)})
+        finally:
+            if db is None:
+                session.close()
+        if rows is None:
+            rows, source = _config_rows(load_roles_config()), "config"
+        changed = self._install(*rows, source=source, sequence=sequence)
+        self._notify(changed)
+
+    def _install(self, roles, permissions, links, source, sequence=None) -> list:
+        role_names = {rid: name for rid, name in roles}
+        permission_names = {pid: name for pid, name in permissions}
+        bits = {pid: i for i, pid in enumerate(sorted(permission_names))}
+        role_links = {rid: set() for rid in role_names}
+        for rid, pid in links:
+            if rid in role_links and pid in bits:
+                role_links[rid].add(pid)
+        compiled = {}
+        for rid, name in role_names.items():
+            pids = role_links[rid]
+            compiled[name] = _compile_role(
+                rid, name, (permission_names[p] for p in pids), sum(1 << bits[p] for p in pids)
+            )
+
+        with self._lock:
+            if sequence is not None:
+                if sequence < self._applied:
+                    # read before a committed change was applied incrementally;
+                    # installing it would resurrect the old grants
+                    self.stale_loads += 1
+                    return []
+                self._applied = sequence
+            first = self._loaded_at is None
+            previous = self._roles
+            self._roles = compiled
+            self._role_names = role_names
+            self._permissions = {name: pid for pid, name in permission_names.items()}
+            self._permission_names = permission_names
+            self._bits = bits
+            self._free_bits = []
+            self._links = role_links
+            self.source = source
+            self._loaded_at = time.monotonic()
+            self.reloads += 1
+        if first:
+            return []
+        # masks are not comparable across rebuilds; compare the permission names
+        def granted(roles, name):
+            grants = roles.get(name)
+            return grants.permissions if grants is not None else None
+        return [name for name in set(previous) | set(compiled) if granted(previous, name) != granted(compiled, name)]
+
+    # -----------------------------
+    # Incremental updates (call after the change is committed)
+    # -----------------------------
+    def role_created(self, role_id: int, name: str):
+        self.roles_created([(role_id, name)])
+
+    def roles_created(self, rows):
+        """rows: (role id, name) pairs committed in one batch."""
+        self._apply(self._roles_created, list(rows))
+
+    def role_renamed(self, role_id: int, name: str):
+        self._apply(self._role_renamed, role_id, name)
+
+    def role_deleted(self, role_id: int):
+        self._apply(self._role_deleted, role_id)
+
+    def permission_created(self, permission_id: int, name: str):
+        self.permissions_created([(permission_id, name)])
+
+    def permissions_created(self, rows):
+        """rows: (permission id, name) pairs committed in one batch."""
+        self._apply(self._permissions_created, list(rows))
+
+    def permission_deleted(self, permission_id: int):
+        self._apply(self._permission_deleted, permission_id)
+
+    def assigned(self, role_id: int, permission_id: int):
+        self.links_changed(added=[(role_id, permission_id)])
+
+    def unassigned(self, role_id: int, permission_id: int):
+        self.links_changed(removed=[(role_id, permission_id)])
+
+    def links_changed(self, added=(), removed=()):
+        """(role id, permission id) links committed in one batch; each affected role recompiles once."""
+        self._apply(self._links_changed, list(added), list(removed))
+
+    def _apply(self, change, *args):
+        """
+        Runs change(*args) under the lock; it returns the affected role names,
+        or None when the matrix cannot apply it locally (not loaded from the
+        database, or ids created by another worker) and a full reload is needed.
+        """
+        with self._lock:
+            changed = change(*args) if self.source == "database" else None
+            if changed is not None:
+                self.updates += 1
+                self._sequence += 1
+                self._applied = self._sequence
+        if changed is None:
+            self.load()
+        else:
+            self._notify(changed)
+
+    def _recompile(self, role_id: int) -> str:
+        name = self._role_names[role_id]
+        pids = self._links[role_id]
+        self._roles[name] = _compile_role(
+            role_id, name, (self._permission_names[p] for p in pids), sum(1 << self._bits[p] for p in pids)
+        )
+        return name
+
+    def _roles_created(self, rows):
+        for role_id, name in rows:
+            self._role_names[role_id] = name
+            self._links[role_id] = set()
+        return [self._recompile(role_id) for role_id, _ in rows]
+
+    def _role_renamed(self, role_id, name):
+        old = self._role_names.get(role_id)
+        if old is None:
+            return None
+        self._roles.pop(old, None)
+        self._role_names[role_id] = name
+        return [old, self._recompile(role_id)]
+
+    def _role_deleted(self, role_id):
+        name = self._role_names.pop(role_id, None)
+        self._links.pop(role_id, None)
+        if name is None:
+            return None
+        self._roles.pop(name, None)
+        return [name]
+
+    def _permissions_created(self, rows):
+        for permission_id, name in rows:
+            self._permissions[name] = permission_id
+            self._permission_names[permission_id] = name
+            self._bits[permission_id] = self._free_bits.pop() if self._free_bits else len(self._bits)
+        return []
+
+    def _permission_deleted(self, permission_id):
+        name = self._permission_names.get(permission_id)
+        if name is None:
+            return None
+        del self._permissions[name]
+        holders = [rid for rid, pids in self._links.items() if permission_id in pids]
+        for rid in holders:
+            self._links[rid].discard(permission_id)
+        changed = [self._recompile(rid) for rid in holders]
+        # no compiled mask references the bit any more; it can be reused
+        del self._permission_names[permission_id]
+        self._free_bits.append(self._bits.pop(permission_id))
+        return changed
+
+    def _links_changed(self, added, removed):
+        pairs = added + removed
+        if any(rid not in self._role_names or pid not in self._bits for rid, pid in pairs):
+            return None
+        for rid, pid in added:
+            self._links[rid].add(pid)
+        for rid, pid in removed:
+            self._links[rid].discard(pid)
+        return [self._recompile(rid) for rid in {rid for rid, _ in pairs}]
+
+    def _notify(self, names):
+        # imported here: role_assigner builds its API on top of this module
+        from .role_assigner import invalidate_role_grants
+        for name in names:
+            invalidate_role_grants(name)
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "roles": len(self._roles),
+            "permissions": len(self._permissions),
+            "links": sum(len(p) for p in self._links.values()),
+            "reloads": self.reloads,
+            "updates": self.updates,
+            "stale_loads": self.stale_loads,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 3) if self._loaded_at else None,
+        }
+
+
+_matrix = None
+_matrix_lock = threading.Lock()
+
+
+def get_permission_matrix() -> PermissionMatrix:
+    global _matrix
+    if _matrix is None:
+        with _matrix_lock:
+            if _matrix is None:
+                _matrix = PermissionMatrix()
+    return _matrix
+
+
+def seed_role_grants(db, config: dict = None) -> int:
+    """
+    Writes the roles config into a database without permissions (first start);
+    returns the number of links created. Keyed on the permissions table, not
+    on role_permission: revoking every grant through the API leaves the
+    permissions in place, so revocations stick across restarts. (Roles alone
+    do not count, signup creates them.)
+    """
+    if db.execute(select(models.Permission.id).limit(1)).first() is not None:
+        return 0
+    config = config if config is not None else load_roles_config()
+    permission_names = sorted({p for grants in config.values() for p in grants})
+
+    def ids(model, names):
+        existing = dict(db.execute(select(model.name, model.id).where(model.name.in_(names))).all())
+        missing = [n for n in names if n not in existing]
+        if missing:
+            db.execute(insert(model), [{"name": n} for n in missing])
+            existing = dict(db.execute(select(model.name, model.id).where(model.name.in_(names))).all())
+        return existing
+
+    role_ids = ids(models.Role, list(config))
+    permission_ids = ids(models.Permission, permission_names)
+    links = [
+        {"role_id": role_ids[role], "permission_id": permission_ids[p]}
+        for role, grants in config.items() for p in dict.fromkeys(grants)
+    ]
+    if links:
+        db.execute(insert(models.role_permission), links)
+    db.commit()
+    logger.info("Seeded role grants from config", extra={"roles": len(role_ids), "links": len(links)})
+    return len(links)
@@ -0,0 +1,132 @@
+# Backend/auth/principal.py
+"""
+Per-request principal resolution with a verified-token cache.
+
+A bearer token is HS256-verified once; the resulting principal (username,
+role, document grants and retrieval labels) is cached under sha256(token)
+until the earlier of the token's `exp` and PRINCIPAL_CACHE_TTL. Only tokens
+that passed verification are ever cached, and the key covers the signature,
+so a tampered token can never hit.
+
+Every cached principal records the grants version of its role
+(role_assigner.grants_version); invalidate_role_grants() changes that
+version, so a revoked grant stops being served on the very next request.
+"""
+import os
+import time
+import hashlib
+import threading
+from dataclasses import dataclass
+from collections import OrderedDict
+
+from Backend.metrics import get_metrics
+from .auth_handler import decode_access_token
+from .role_assigner import allowed_docs, allowed_labels, grants_version
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", "300"))  # seconds
+
+
+@dataclass(frozen=True)
+class Principal:
+    username: str
+    role: str
+    grants: tuple  # document collections, e.g. ("finance_docs", "general_docs")
+    labels: tuple  # chunk role labels those grants cover
+    expires_at: float  # token exp (epoch seconds)
+
+    def as_dict(self) -> dict:
+        return {"username": self.username, "role": self.role}
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def _exp_timestamp(exp) -> float:
+    # python-jose returns the numeric claim; tolerate datetimes from other encoders
+    return exp.timestamp() if hasattr(exp, "timestamp") else float(exp)
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # digest -> (principal, valid_until, grants version)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str):
+        key = _token_digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                principal, valid_until, version = entry
+                if now < valid_until and version == grants_version(principal.role):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return principal
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def put(self, token: str, principal: Principal, version: tuple):
+        valid_until = min(principal.expires_at, time.time() + self.ttl)
+        with self._lock:
+            self._entries[_token_digest(token)] = (principal, valid_until, version)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_token(self, token: str):
+        with self._lock:
+            self._entries.pop(_token_digest(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_cache = PrincipalCache()
+
+
+def get_principal_cache() -> PrincipalCache:
+    return _cache
+
+
+def resolve_principal(token: str):
+    """Verified principal for a bearer token, or None if it is invalid or expired."""
+    metrics = get_metrics()
+    principal = _cache.get(token)
+    if principal is not None:
+        metrics.inc("auth_principal_cache_total", result="hit")
+        return principal
+    metrics.inc("auth_principal_cache_total", result="miss")
+
+    with metrics.timer("auth_token_decode_seconds"):
+        data = decode_access_token(token)
+    if not data or "sub" not in data:
+        return None
+
+    role = data.get("role")
+    # read the version before the grants so a concurrent change can only make the entry stale
+    version = grants_version(role)
+    principal = Principal(
+        username=data["sub"],
+        role=role,
+        grants=tuple(allowed_docs(role)),
+        labels=allowed_labels(role) if role else (),
+        expires_at=_exp_timestamp(data["exp"]),
+    )
+    _cache.put(token, principal, version)
+    return principal
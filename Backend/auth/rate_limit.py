@@ -0,0 +1,61 @@
+# Backend/auth/rate_limit.py
+"""
+In-process token-bucket rate limiting for the password endpoints.
+
+Checked before any argon2 work is queued, per client IP and per username,
+so one noisy client or a credential-stuffing run against one account cannot
+fill the hashing queue. Limits are per worker process.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+from Backend.metrics import get_metrics
+
+# requests per minute (sustained) and burst size
+AUTH_IP_RATE = float(os.getenv("AUTH_IP_RATE", "60"))
+AUTH_IP_BURST = float(os.getenv("AUTH_IP_BURST", "20"))
+AUTH_USER_RATE = float(os.getenv("AUTH_USER_RATE", "10"))
+AUTH_USER_BURST = float(os.getenv("AUTH_USER_BURST", "5"))
+# buckets kept per limiter (least recently used are dropped, i.e. reset to full)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("AUTH_RATE_MAX_KEYS", "100000"))
+
+
+class RateLimited(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"rate limited ({scope})")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    def __init__(self, scope: str, per_minute: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.scope = scope
+        self.rate = per_minute / 60.0  # tokens per second
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str):
+        """Consumes one token for key; raises RateLimited with the wait until the next token."""
+        if self.rate <= 0 or key is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if not allowed:
+            get_metrics().inc("auth_rate_limited_total", scope=self.scope)
+            raise RateLimited(self.scope, (1.0 - tokens) / self.rate)
+
+
+ip_limiter = TokenBucketLimiter("ip", AUTH_IP_RATE, AUTH_IP_BURST)
+user_limiter = TokenBucketLimiter("user", AUTH_USER_RATE, AUTH_USER_BURST)
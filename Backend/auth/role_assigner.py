@@ -1,28 +1,72 @@
-import json
-import os
-
-DEFAULT_ROLES = {
-    "Finance": ["finance_docs", "general_docs"],
-    "Marketing": ["marketing_docs", "general_docs"],
-    "HR": ["hr_docs", "general_docs"],
-    "Engineering": ["engineering_docs", "general_docs"],
-    "C_Level": ["finance_docs", "marketing_docs", "hr_docs", "engineering_docs", "c_level_docs", "general_docs"],
-    "Employee": ["general_docs"]
-}
-
-ROLES_CONFIG_PATH = os.getenv("ROLES_CONFIG_PATH", "backend/auth/roles_config.json")
-
-def load_roles_config():
-    try:
-        with open(ROLES_CONFIG_PATH, "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return DEFAULT_ROLES
-    
-_roles=load_roles_config()
+import threading
+
+# Grants live in the database and are compiled by permission_matrix; the
+# config names are re-exported for existing imports.
+from .permission_matrix import (
+    DEFAULT_ROLES,
+    DOC_COLLECTION_LABELS,
+    ROLES_CONFIG_PATH,
+    load_roles_config,
+    get_permission_matrix,
+)
+
 
 def allowed_docs(role: str) -> list:
-    return _roles.get(role, [])
+    return list(get_permission_matrix().role(role).documents)
 
 def access_of_role(role: str, document: str) -> bool:
-    return document in allowed_docs(role)
+    return get_permission_matrix().has_permission(role, document)
+
+
+def allowed_labels(role: str) -> tuple:
+    """
+    Chunk metadata labels a role may retrieve, derived from its collection grants.
+    Roles without grants only see chunks labelled with their own name.
+    """
+    return get_permission_matrix().role(role).labels
+
+
+def retrieval_filter(role: str) -> dict:
+    """
+    Chroma metadata filter covering every collection granted to the role,
+    so multi-department roles need a single search. Compiled with the role's
+    grants; treat the returned dict as read-only.
+    """
+    return get_permission_matrix().role(role).search_filter
+
+
+# -----------------------------
+# Grant versioning / invalidation
+# -----------------------------
+_grants_lock = threading.Lock()
+_grants_generation = 0  # bumped when every role may have changed
+_role_versions = {}  # role -> bumped when that role's grants change
+_grant_listeners = []
+
+
+def grants_version(role: str) -> tuple:
+    """Changes whenever the grants of `role` may have changed; caches compare it on read."""
+    return _grants_generation, _role_versions.get(role, 0)
+
+
+def on_grants_changed(callback):
+    """callback(role or None) runs after grants change (None = all roles)."""
+    _grant_listeners.append(callback)
+
+
+def invalidate_role_grants(role: str = None):
+    """Drop everything derived from the grants of one role (or of all roles)."""
+    global _grants_generation
+    with _grants_lock:
+        if role is None:
+            _grants_generation += 1
+        else:
+            _role_versions[role] = _role_versions.get(role, 0) + 1
+    for callback in list(_grant_listeners):
+        callback(role)
+
+
+def reload_roles():
+    """Recompile the permission matrix from the database and drop every derived per-role cache."""
+    get_permission_matrix().load()
+    invalidate_role_grants()
@@ -1,52 +1,93 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Dict
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from Backend.Model.user_model import SignUpBody, LoginBody, TokenResponse, InnerDB
-from .auth_handler import get_password_hash, verify_password, create_access_token, decode_access_token
-from .role_assigner import allowed_docs as allowed_collections_for_role
+from Backend.Database.connections import get_db
+from Backend.metrics import get_metrics
+from Backend.Model.user_model import SignUpBody, LoginBody, TokenResponse
+from .auth_handler import create_access_token
+from .password_hasher import get_password_hasher, HashQueueFull
+from .principal import Principal, resolve_principal
+from .rate_limit import ip_limiter, user_limiter, RateLimited
+from .user_store import get_user, create_user, primary_role, update_password_hash, UserExists
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-_users_db: Dict[str, InnerDB] = {}
+
+def _retry_after(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, int(seconds + 0.999)))}
+
+
+def _admit(request: Request, username: str):
+    """Rate limits by client IP and username before any argon2 work is queued."""
+    try:
+        ip_limiter.hit(request.client.host if request.client else None)
+        user_limiter.hit(username)
+    except RateLimited as e:
+        raise HTTPException(status_code=429, detail="Too many attempts, retry later", headers=_retry_after(e.retry_after))
+
+
+async def _hashing(coro):
+    try:
+        return await coro
+    except HashQueueFull as e:
+        raise HTTPException(status_code=503, detail="Authentication is busy, retry later", headers=_retry_after(e.retry_after))
 
 
 @router.post("/signup", response_model=dict)
-def signup(payload: SignUpBody):
+async def signup(payload: SignUpBody, request: Request, db: Session = Depends(get_db)):
     username = payload.username
-    if username in _users_db:
+    _admit(request, username)
+    # cheap pre-check; the unique index still decides concurrent signups
+    if await run_in_threadpool(get_user, db, username) is not None:
+        raise HTTPException(status_code=400, detail="User already exists")
+    hashed = await _hashing(get_password_hasher().hash(payload.password))
+    try:
+        await run_in_threadpool(create_user, db, username, hashed, payload.role)
+    except UserExists:
         raise HTTPException(status_code=400, detail="User already exists")
-    hashed = get_password_hash(payload.password)
-    user = InnerDB(username=username, hashed_password=hashed, role=payload.role)
-    _users_db[username] = user
     return {"msg": f"user {username} created with role {payload.role}"}
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginBody):
-    user = _users_db.get(payload.username)
-    if not user or not verify_password(payload.password, user.hashed_password):
+async def login(payload: LoginBody, request: Request, db: Session = Depends(get_db)):
+    _admit(request, payload.username)
+    user = await run_in_threadpool(get_user, db, payload.username)
+    if not user or not user.is_active:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    valid, new_hash = await _hashing(get_password_hasher().verify_and_update(payload.password, user.password))
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid username or password")
-    token = create_access_token(subject=user.username, role=user.role)
+    role, username = primary_role(user), user.username  # read before the rehash commit expires them
+    if new_hash:
+        # stored with outdated argon2 parameters: upgrade transparently
+        await run_in_threadpool(update_password_hash, db, user, new_hash)
+        get_metrics().inc("auth_rehash_total")
+    token = create_access_token(subject=username, role=role)
     return TokenResponse(
     access_token=token,
-    role=user.role,
+    role=role,
     token_type="bearer"
 )
 
 
-
 security = HTTPBearer()
 
-def get_current_user_role(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    data = decode_access_token(token)
-    if not data or "sub" not in data:
+def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Principal:
+    """
+    Resolves the bearer token once per request (FastAPI caches dependencies
+    within a request) and across requests via the principal cache.
+    """
+    principal = resolve_principal(credentials.credentials)
+    if principal is None:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
-    return {"username": data["sub"], "role": data.get("role")}
+    return principal
+
+
+def get_current_user_role(principal: Principal = Depends(get_current_principal)):
+    return principal.as_dict()
 
 @router.get("/me/collections")
-def my_collections(user=Depends(get_current_user_role)):
-    role = user["role"]
-    collections = allowed_collections_for_role(role)
-    return {"username": user["username"], "role": role, "allowed_collections": collections}
+def my_collections(principal: Principal = Depends(get_current_principal)):
+    return {"username": principal.username, "role": principal.role, "allowed_collections": list(principal.grants)}
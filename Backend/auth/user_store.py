@@ -0,0 +1,68 @@
+# Backend/auth/user_store.py
+"""
+Users and their roles in the SQL database (models.User / models.Role via
+user_role), shared by every uvicorn worker.
+
+Lookups go through the unique username index and load role membership in
+the same round trip (selectinload), so login is one indexed query plus one
+IN query for the roles.
+"""
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from Backend.Database import models
+
+
+class UserExists(Exception):
+    pass
+
+
+def get_user(db: Session, username: str) -> Optional[models.User]:
+    stmt = (
+        select(models.User)
+        .where(models.User.username == username)
+        .options(selectinload(models.User.roles))
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
+
+def primary_role(user: models.User) -> Optional[str]:
+    """The role put in the access token (users are created with exactly one)."""
+    return user.roles[0].name if user.roles else None
+
+
+def _get_or_create_role(db: Session, name: str) -> models.Role:
+    role = db.execute(select(models.Role).where(models.Role.name == name)).scalar_one_or_none()
+    if role is not None:
+        return role
+    try:
+        # savepoint: another worker may create the same role concurrently
+        with db.begin_nested():
+            role = models.Role(name=name)
+            db.add(role)
+    except IntegrityError:
+        role = db.execute(select(models.Role).where(models.Role.name == name)).scalar_one()
+    return role
+
+
+def create_user(db: Session, username: str, hashed_password: str, role_name: str) -> models.User:
+    """Inserts the user with its role in one transaction; raises UserExists on a duplicate username."""
+    user = models.User(username=username, password=hashed_password, is_active=True)
+    user.roles.append(_get_or_create_role(db, role_name))
+    db.add(user)
+    try:
+        db.commit()
+    except IntegrityError as e:
+        # the unique username index decides races between workers
+        db.rollback()
+        raise UserExists(username) from e
+    return user
+
+
+def update_password_hash(db: Session, user: models.User, hashed_password: str):
+    """Replaces the stored hash (rehash-on-login after an argon2 cost change)."""
+    user.password = hashed_password
+    db.commit()
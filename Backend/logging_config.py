@@ -0,0 +1,156 @@
+# Backend/logging_config.py
+"""
+Process-wide logging setup, done once at startup (main.py / CLI entry points).
+
+Request threads never touch a file: records go onto a bounded in-memory
+queue (dropped and counted if it ever fills) and a background listener
+thread writes them as JSON lines to a size-rotated file, plus stderr.
+DEBUG records are sampled before they are queued (LOG_DEBUG_SAMPLE = share
+kept), so debug logging can stay on in production.
+
+Env:
+  LOG_LEVEL          root level (INFO)
+  LOG_FILE           JSON-lines log file (./logs/backend.jsonl; empty = no file)
+  LOG_MAX_BYTES      rotate after this many bytes (10 MB)
+  LOG_BACKUPS        rotated files kept (5)
+  LOG_DEBUG_SAMPLE   fraction of DEBUG records kept with LOG_LEVEL=DEBUG (0.01)
+  LOG_STDERR         also log to stderr (true)
+  LOG_QUEUE_SIZE     records buffered before dropping (10000)
+"""
+import os
+import sys
+import json
+import queue
+import random
+import atexit
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "./logs/backend.jsonl")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+LOG_DEBUG_SAMPLE = float(os.getenv("LOG_DEBUG_SAMPLE", "0.01"))
+LOG_STDERR = os.getenv("LOG_STDERR", "true").lower() in ("1", "true", "yes")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# attributes every LogRecord has; anything else came in through extra=
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, thread, extra fields, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Keeps every record at INFO and above, and a random share of DEBUG records."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller: a full queue drops the record."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _handlers():
+    handlers = []
+    if LOG_FILE:
+        dirname = os.path.dirname(LOG_FILE)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    if LOG_STDERR:
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s"))
+        handlers.append(stream)
+    return handlers
+
+
+def _after_fork_in_child():
+    # the listener thread does not survive fork(); worker processes log synchronously to stderr
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(JsonFormatter())
+        root.addHandler(stream)
+    _listener = None
+    _queue_handler = None
+
+
+def configure_logging():
+    """Installs the queue handler on the root logger. Safe to call more than once."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _queue_handler = DroppingQueueHandler(log_queue)
+        _queue_handler.addFilter(DebugSampler(LOG_DEBUG_SAMPLE))
+        # replace whatever basicConfig/uvicorn put on the root so records are written once
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, *_handlers(), respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -1,13 +1,24 @@
+import os
+import logging
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
+from Backend.logging_config import configure_logging, shutdown_logging
 from Backend.auth.routes import router as auth_router
 from Backend.roles.routes import router as role_router
 from Backend.permissions.routes import router as permission_router
 from Backend.Rag.api import router as rag_router
+from Backend.Rag.model_registry import get_registry
+from Backend.Rag.inference_pool import get_inference_pool
+from Backend.metrics import get_metrics
 
-from Backend.Database.connections import Base, engine
+from Backend.Database.connections import Base, engine, SessionLocal
 from Backend.Database import models
+from Backend.auth.permission_matrix import seed_role_grants
+
+configure_logging()
+logger = logging.getLogger("backend")
 
 app = FastAPI(title="RBAC RAG System")
 
@@ -16,12 +27,42 @@ app.include_router(role_router)
 app.include_router(permission_router)
 app.include_router(rag_router)
 
+# Optional: load embedder, Chroma and LLM before serving the first query
+RAG_WARMUP = os.getenv("RAG_WARMUP", "false").lower() in ("1", "true", "yes")
+
+
+@app.on_event("startup")
+def warmup_models():
+    if RAG_WARMUP:
+        report = get_registry().warmup()
+        logger.info("RAG models warmed up", extra={"report": report})
+
+
+@app.on_event("shutdown")
+def shutdown_inference_pool():
+    get_inference_pool().shutdown()
+    shutdown_logging()
+
 @app.get("/")
 def root():
     return {"msg": "RBAC RAG Chatbot API running"}
 
-# Create DB tables
+
+@app.get("/metrics")
+def metrics(format: str = "prometheus"):
+    """
+    Prometheus text exposition; ?format=json gives p50/p95/p99 per stage and role.
+    """
+    if format == "json":
+        return get_metrics().summary()
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4")
+
+# Create DB tables (and association indexes missing from older databases)
 Base.metadata.create_all(bind=engine)
+models.ensure_indexes(engine)
+# First start of a database: write the roles config as role/permission rows
+with SessionLocal() as _db:
+    seed_role_grants(_db)
 
 if __name__ == "__main__":
     uvicorn.run("Backend.main:app", host="127.0.0.1", port=8000, reload=True)
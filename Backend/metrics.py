@@ -0,0 +1,287 @@
+# Backend/metrics.py
+"""
+In-process metrics: histograms, counters and gauges with Prometheus text
+exposition (served on /metrics by main.py) plus a JSON summary with
+p50/p95/p99 per stage and per role.
+
+Histograms use fixed buckets, so an observation is a bisect and two integer
+adds under a lock; quantiles are interpolated from the buckets at read time.
+Gauges are callbacks evaluated only when /metrics is scraped.
+
+Optional sampling profiler: with PROFILE_SLOW_MS > 0, requests wrapped in
+profile_request() have their thread's stack sampled every
+PROFILE_INTERVAL_MS, and the hottest stacks are logged when the request
+takes longer than the threshold.
+"""
+import os
+import sys
+import time
+import bisect
+import logging
+import threading
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger("metrics")
+
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))  # 0 = profiler off
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_TOP_STACKS = 10
+
+# seconds: 0.5 ms .. ~65 s, doubling
+LATENCY_BUCKETS = tuple(0.0005 * 2 ** i for i in range(18))
+
+
+def _label_key(labels: dict):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(key, extra=None) -> str:
+    items = list(key) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + body + "}"
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Linear interpolation inside the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # name -> {label key: Histogram}
+        self._counters = {}  # name -> {label key: float}
+        self._gauges = {}  # name -> callable() -> number or {label key: number}
+        self._help = {}
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def gauge(self, name: str, fn):
+        """
+        Registers a callback read at scrape time. It returns a number, None
+        (series skipped) or {((label, value), ...): number} for labelled series.
+        """
+        self._gauges[name] = fn
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    # -----------------------------
+    # exposition
+    # -----------------------------
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {
+                n: {k: (list(h.counts), h.count, h.sum, h.buckets) for k, h in s.items()}
+                for n, s in self._histograms.items()
+            }
+
+        for name, series in sorted(counters.items()):
+            self._header(lines, name, "counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        for name, fn in sorted(self._gauges.items()):
+            try:
+                value = fn()
+            except Exception:
+                logger.exception("Gauge %s failed", name)
+                continue
+            if value is None:
+                continue
+            self._header(lines, name, "gauge")
+            if isinstance(value, dict):
+                for labels, v in value.items():
+                    lines.append(f"{name}{_format_labels(_label_key(dict(labels)))} {v}")
+            else:
+                lines.append(f"{name} {value}")
+
+        for name, series in sorted(histograms.items()):
+            self._header(lines, name, "histogram")
+            for key, (counts, count, total, buckets) in series.items():
+                cumulative = 0
+                for bound, n in zip(buckets, counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def _header(self, lines, name, kind):
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def summary(self, rollup: str = "role") -> dict:
+        """
+        p50/p95/p99 (ms) and counts for every histogram series, plus counters.
+        Series are also merged across the `rollup` label (e.g. per stage over all roles).
+        """
+        out = {"histograms": {}, "counters": {}}
+        with self._lock:
+            for name, series in self._histograms.items():
+                merged = {}
+                for key, h in series.items():
+                    if rollup not in dict(key):
+                        continue
+                    mkey = tuple((k, v) for k, v in key if k != rollup) + ((rollup, "*"),)
+                    m = merged.setdefault(mkey, Histogram(h.buckets))
+                    m.counts = [a + b for a, b in zip(m.counts, h.counts)]
+                    m.count += h.count
+                    m.sum += h.sum
+                out["histograms"][name] = [
+                    {
+                        "labels": dict(key),
+                        "count": h.count,
+                        "p50_ms": round(1000 * h.quantile(0.50), 3),
+                        "p95_ms": round(1000 * h.quantile(0.95), 3),
+                        "p99_ms": round(1000 * h.quantile(0.99), 3),
+                    }
+                    for key, h in list(series.items()) + list(merged.items())
+                ]
+            for name, series in self._counters.items():
+                out["counters"][name] = [{"labels": dict(k), "value": v} for k, v in series.items()]
+        return out
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _metrics
+
+
+# -----------------------------
+# RAG stage helpers
+# -----------------------------
+_metrics.describe("rag_stage_seconds", "Latency of each RAG pipeline stage")
+_metrics.describe("rag_request_seconds", "End-to-end latency of RAG endpoints")
+_metrics.describe("auth_token_decode_seconds", "JWT decode and validation latency")
+
+
+def record_stages(role: str, timings: dict, endpoint: str = "query"):
+    """Feeds a RAGChain timings dict (seconds per stage) into the stage histograms."""
+    for stage, seconds in timings.items():
+        _metrics.observe("rag_stage_seconds", seconds, stage=stage, role=role, endpoint=endpoint)
+
+
+# -----------------------------
+# Sampling profiler for slow requests
+# -----------------------------
+class _StackSampler:
+    """One background thread sampling the stacks of threads currently being profiled."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._targets = {}  # thread id -> Counter of stacks
+        self._thread = None
+
+    def start(self, thread_id: int) -> Counter:
+        samples = Counter()
+        with self._lock:
+            self._targets[thread_id] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="stack-sampler", daemon=True)
+                self._thread.start()
+        return samples
+
+    def stop(self, thread_id: int):
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                targets = dict(self._targets)
+            if not targets:
+                continue
+            frames = sys._current_frames()
+            for tid, samples in targets.items():
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = tuple(
+                    f"{os.path.basename(fs.filename)}:{fs.lineno}:{fs.name}"
+                    for fs in traceback.extract_stack(frame)[-12:]
+                )
+                samples[stack] += 1
+
+
+_sampler = _StackSampler(PROFILE_INTERVAL_MS / 1000.0) if PROFILE_SLOW_MS > 0 else None
+
+
+@contextmanager
+def profile_request(name: str, **labels):
+    """Samples the current thread while the block runs; logs hot stacks if it was slow."""
+    if _sampler is None:
+        yield
+        return
+    tid = threading.get_ident()
+    samples = _sampler.start(tid)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        _sampler.stop(tid)
+        if elapsed_ms >= PROFILE_SLOW_MS and samples:
+            total = sum(samples.values())
+            _metrics.inc("slow_requests_profiled_total", request=name)
+            lines = [f"Slow {name} {labels}: {elapsed_ms:.0f} ms, {total} samples"]
+            for stack, n in samples.most_common(PROFILE_TOP_STACKS):
+                lines.append(f"  {100 * n / total:5.1f}%  " + " <- ".join(reversed(stack[-4:])))
+            logger.warning("\n".join(lines))
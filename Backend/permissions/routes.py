@@ -1,33 +1,69 @@
 # Backend/permissions/routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, insert, delete, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from Backend.Database.connections import get_db
 from Backend.Database import models
-from .schema import PermissionCreate, PermissionResponse
+from Backend.Database.bulk import (
+    BULK_MAX_ITEMS, PAGE_MAX, chunked, keyset_page, insert_missing_names,
+)
+from Backend.auth.permission_matrix import get_permission_matrix
+from .schema import (
+    PermissionCreate, PermissionResponse, PermissionBulkCreate, PermissionLinkBatch, BulkLinkResult,
+)
 
 router = APIRouter(prefix="/permissions", tags=["Permissions"])
 
 # CREATE Permission
 @router.post("/", response_model=PermissionResponse)
 def create_permission(payload: PermissionCreate, db: Session = Depends(get_db)):
-    existing = db.query(models.Permission).filter(models.Permission.name == payload.name).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Permission already exists")
     new_permission = models.Permission(name=payload.name)
     db.add(new_permission)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # the unique name constraint decides duplicates
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Permission already exists")
     db.refresh(new_permission)
+    get_permission_matrix().permission_created(new_permission.id, new_permission.name)
     return new_permission
 
-# READ ALL Permissions
+# CREATE Permissions in bulk (names that already exist are skipped)
+@router.post("/bulk", response_model=list[PermissionResponse])
+def create_permissions_bulk(payload: PermissionBulkCreate, db: Session = Depends(get_db)):
+    if len(payload.names) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {BULK_MAX_ITEMS})")
+    try:
+        created = insert_missing_names(db, models.Permission, payload.names)
+        db.commit()
+    except IntegrityError:
+        # a concurrent request created one of the names first
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Permission already exists")
+    get_permission_matrix().permissions_created(created)
+    return [{"id": pid, "name": name} for pid, name in created]
+
+# READ Permissions (all rows unless ?limit= or ?after= is given; then keyset pages,
+# pass the X-Next-Cursor header back as ?after=)
 @router.get("/", response_model=list[PermissionResponse])
-def get_permissions(db: Session = Depends(get_db)):
-    return db.query(models.Permission).all()
+def get_permissions(
+    response: Response,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX),
+    db: Session = Depends(get_db),
+):
+    permissions, next_cursor = keyset_page(db, models.Permission, after, limit)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return permissions
 
 # READ by ID
 @router.get("/{permission_id}", response_model=PermissionResponse)
 def get_permission(permission_id: int, db: Session = Depends(get_db)):
-    permission = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
+    permission = db.get(models.Permission, permission_id)
     if not permission:
         raise HTTPException(status_code=404, detail="Permission not found")
     return permission
@@ -35,41 +71,119 @@ def get_permission(permission_id: int, db: Session = Depends(get_db)):
 # DELETE
 @router.delete("/{permission_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_permission(permission_id: int, db: Session = Depends(get_db)):
-    permission = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
+    permission = db.get(models.Permission, permission_id)
     if not permission:
         raise HTTPException(status_code=404, detail="Permission not found")
+    db.execute(delete(models.role_permission).where(models.role_permission.c.permission_id == permission_id))
     db.delete(permission)
     db.commit()
+    get_permission_matrix().permission_deleted(permission_id)
     return None
 
 # LINK Permission to Role
 @router.post("/assign/{role_id}/{permission_id}")
 def assign_permission_to_role(role_id: int, permission_id: int, db: Session = Depends(get_db)):
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
-    permission = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
+    role = db.get(models.Role, role_id)
+    permission = db.get(models.Permission, permission_id)
 
     if not role or not permission:
         raise HTTPException(status_code=404, detail="Role or Permission not found")
 
-    if permission in role.permissions:
+    # one row insert; the unique (role_id, permission_id) index rejects duplicates
+    # without loading the role's permission list
+    try:
+        db.execute(insert(models.role_permission).values(role_id=role_id, permission_id=permission_id))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Permission already assigned")
-
-    role.permissions.append(permission)
-    db.commit()
+    get_permission_matrix().assigned(role_id, permission_id)
     return {"message": f"Permission '{permission.name}' assigned to role '{role.name}'"}
 
 # UNLINK Permission from Role
 @router.delete("/unassign/{role_id}/{permission_id}")
 def remove_permission_from_role(role_id: int, permission_id: int, db: Session = Depends(get_db)):
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
-    permission = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
+    role = db.get(models.Role, role_id)
+    permission = db.get(models.Permission, permission_id)
 
     if not role or not permission:
         raise HTTPException(status_code=404, detail="Role or Permission not found")
 
-    if permission not in role.permissions:
+    result = db.execute(
+        delete(models.role_permission).where(
+            models.role_permission.c.role_id == role_id,
+            models.role_permission.c.permission_id == permission_id,
+        )
+    )
+    if result.rowcount == 0:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Permission not assigned")
-
-    role.permissions.remove(permission)
     db.commit()
+    get_permission_matrix().unassigned(role_id, permission_id)
     return {"message": f"Permission '{permission.name}' removed from role '{role.name}'"}
+
+
+# -----------------------------
+# Bulk link / unlink (one transaction per batch)
+# -----------------------------
+_link = models.role_permission.c
+
+
+def _batch_pairs(payload: PermissionLinkBatch) -> list:
+    if len(payload.links) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {BULK_MAX_ITEMS})")
+    return list(dict.fromkeys((link.role_id, link.permission_id) for link in payload.links))
+
+
+def _require_ids(db: Session, pairs: list):
+    """404 for the whole batch if any role or permission id does not exist."""
+    missing = {}
+    for model, ids in ((models.Role, {r for r, _ in pairs}), (models.Permission, {p for _, p in pairs})):
+        found = set()
+        for chunk in chunked(ids):
+            found.update(db.execute(select(model.id).where(model.id.in_(chunk))).scalars())
+        if ids - found:
+            missing[model.__tablename__] = sorted(ids - found)
+    if missing:
+        raise HTTPException(status_code=404, detail={"msg": "Role or Permission not found", "missing": missing})
+
+
+def _existing_links(db: Session, pairs: list) -> set:
+    existing = set()
+    for chunk in chunked(pairs):
+        existing.update(
+            tuple(row) for row in db.execute(
+                select(_link.role_id, _link.permission_id).where(tuple_(_link.role_id, _link.permission_id).in_(chunk))
+            )
+        )
+    return existing
+
+
+@router.post("/assign/bulk", response_model=BulkLinkResult)
+def assign_permissions_bulk(payload: PermissionLinkBatch, db: Session = Depends(get_db)):
+    pairs = _batch_pairs(payload)
+    _require_ids(db, pairs)
+    existing = _existing_links(db, pairs)
+    added = [pair for pair in pairs if pair not in existing]
+    try:
+        if added:
+            db.execute(insert(models.role_permission), [{"role_id": r, "permission_id": p} for r, p in added])
+        db.commit()
+    except IntegrityError:
+        # a concurrent request linked one of the pairs first; nothing was applied
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Links changed concurrently, retry the batch")
+    get_permission_matrix().links_changed(added=added)
+    return BulkLinkResult(requested=len(pairs), changed=len(added), unchanged=len(pairs) - len(added))
+
+
+@router.post("/unassign/bulk", response_model=BulkLinkResult)
+def remove_permissions_bulk(payload: PermissionLinkBatch, db: Session = Depends(get_db)):
+    pairs = _batch_pairs(payload)
+    _require_ids(db, pairs)
+    removed = sorted(_existing_links(db, pairs))
+    for chunk in chunked(removed):
+        db.execute(delete(models.role_permission).where(tuple_(_link.role_id, _link.permission_id).in_(chunk)))
+    db.commit()
+    get_permission_matrix().links_changed(removed=removed)
+    return BulkLinkResult(requested=len(pairs), changed=len(removed), unchanged=len(pairs) - len(removed))
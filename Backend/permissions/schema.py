@@ -12,3 +12,18 @@ class PermissionResponse(PermissionBase):
 
     class Config:
         from_attributes = True  # ✅ for Pydantic v2
+
+class PermissionBulkCreate(BaseModel):
+    names: list[str]
+
+class PermissionLink(BaseModel):
+    role_id: int
+    permission_id: int
+
+class PermissionLinkBatch(BaseModel):
+    links: list[PermissionLink]
+
+class BulkLinkResult(BaseModel):
+    requested: int
+    changed: int  # links assigned (or removed)
+    unchanged: int  # already assigned (or not assigned)
@@ -1,33 +1,64 @@
 # Backend/roles/routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from Backend.Database.connections import get_db
 from Backend.Database import models
-from .schemas import RoleCreate, RoleResponse
+from Backend.Database.bulk import BULK_MAX_ITEMS, PAGE_MAX, keyset_page, insert_missing_names
+from Backend.auth.permission_matrix import get_permission_matrix
+from .schemas import RoleCreate, RoleResponse, RoleBulkCreate
 
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
 # CREATE ROLE
 @router.post("/", response_model=RoleResponse)
 def create_role(payload: RoleCreate, db: Session = Depends(get_db)):
-    role = db.query(models.Role).filter(models.Role.name == payload.name).first()
-    if role:
-        raise HTTPException(status_code=400, detail="Role already exists")
     new_role = models.Role(name=payload.name)
     db.add(new_role)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # the unique name index decides duplicates
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Role already exists")
     db.refresh(new_role)
+    get_permission_matrix().role_created(new_role.id, new_role.name)
     return new_role
 
-# READ ALL ROLES
+# CREATE ROLES IN BULK (names that already exist are skipped)
+@router.post("/bulk", response_model=list[RoleResponse])
+def create_roles_bulk(payload: RoleBulkCreate, db: Session = Depends(get_db)):
+    if len(payload.names) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large (max {BULK_MAX_ITEMS})")
+    try:
+        created = insert_missing_names(db, models.Role, payload.names)
+        db.commit()
+    except IntegrityError:
+        # a concurrent request created one of the names first
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Role already exists")
+    get_permission_matrix().roles_created(created)
+    return [{"id": rid, "name": name} for rid, name in created]
+
+# READ ROLES (all rows unless ?limit= or ?after= is given; then keyset pages,
+# pass the X-Next-Cursor header back as ?after=)
 @router.get("/", response_model=list[RoleResponse])
-def get_roles(db: Session = Depends(get_db)):
-    return db.query(models.Role).all()
+def get_roles(
+    response: Response,
+    after: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX),
+    db: Session = Depends(get_db),
+):
+    roles, next_cursor = keyset_page(db, models.Role, after, limit)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return roles
 
 # READ ROLE BY ID
 @router.get("/{role_id}", response_model=RoleResponse)
 def get_role(role_id: int, db: Session = Depends(get_db)):
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
+    role = db.get(models.Role, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     return role
@@ -35,20 +66,26 @@ def get_role(role_id: int, db: Session = Depends(get_db)):
 # UPDATE ROLE
 @router.put("/{role_id}", response_model=RoleResponse)
 def update_role(role_id: int, payload: RoleCreate, db: Session = Depends(get_db)):
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
+    role = db.get(models.Role, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     role.name = payload.name
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Role already exists")
     db.refresh(role)
+    get_permission_matrix().role_renamed(role.id, role.name)
     return role
 
 # DELETE ROLE
 @router.delete("/{role_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_role(role_id: int, db: Session = Depends(get_db)):
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
+    role = db.get(models.Role, role_id)
     if not role:
         raise HTTPException(status_code=404, detail="Role not found")
     db.delete(role)
     db.commit()
+    get_permission_matrix().role_deleted(role_id)
     return None
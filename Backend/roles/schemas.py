@@ -12,3 +12,6 @@ class RoleResponse(RoleBase):
 
     class Config:
         orm_mode = True
+
+class RoleBulkCreate(BaseModel):
+    names: list[str]
@@ -1,6 +1,7 @@
 # frontend/app.py
 import streamlit as st
 import requests
+import json
 import os
 
 API_BASE = os.getenv("API_BASE", "http://127.0.0.1:8000")
@@ -54,16 +55,60 @@ if not st.session_state.token:
 
 st.subheader("Ask a question")
 question = st.text_area("Your question", height=120, key="question_input")
+stream_answer = st.checkbox("Stream answer", value=True)
+
+
+def iter_sse(response):
+    """Yields (event, data) pairs from a text/event-stream response."""
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if event:
+                yield event, json.loads("\n".join(data) or "{}")
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def show_sources(sources):
+    st.markdown("**Sources:**")
+    for s in sources:
+        st.markdown(f"- **{s.get('source')}** (role: {s.get('role')})")
+        st.code(s.get("content_snippet"))
+
+
 if st.button("Send"):
     headers = {"Authorization": f"Bearer {st.session_state.token}"}
-    r = requests.post(f"{API_BASE}/rag/query", json={"question": question}, headers=headers)
-    if r.status_code == 200:
-        resp = r.json()
-        st.markdown(f"**Answer ({resp.get('role')}):**")
-        st.write(resp.get("answer"))
-        st.markdown("**Sources:**")
-        for s in resp.get("sources", []):
-            st.markdown(f"- **{s.get('source')}** (role: {s.get('role')})")
-            st.code(s.get("content_snippet"))
+    if stream_answer:
+        with requests.post(f"{API_BASE}/rag/query/stream", json={"question": question}, headers=headers, stream=True) as r:
+            if r.status_code != 200:
+                st.error(r.text)
+            else:
+                st.markdown(f"**Answer ({st.session_state.role}):**")
+                answer_box = st.empty()
+                sources_box = st.container()
+                answer = ""
+                for event, data in iter_sse(r):
+                    if event == "sources":
+                        # sources arrive before the first token
+                        with sources_box:
+                            show_sources(data.get("sources", []))
+                    elif event == "token":
+                        answer += data.get("text", "")
+                        answer_box.markdown(answer + "▌")
+                    elif event == "error":
+                        st.error(data.get("detail"))
+                answer_box.markdown(answer)
     else:
-        st.error(r.text)
+        r = requests.post(f"{API_BASE}/rag/query", json={"question": question}, headers=headers)
+        if r.status_code == 200:
+            resp = r.json()
+            st.markdown(f"**Answer ({resp.get('role')}):**")
+            st.write(resp.get("answer"))
+            show_sources(resp.get("sources", []))
+        else:
+            st.error(r.text)
@@ -0,0 +1,180 @@
+# benchmarks/inference_backends.py
+"""
+Compares CPU inference backends (fp32 / int8 / onnx) for the embedder and
+the seq2seq generator:
+
+  embedder  - p50/p95 latency per batch, texts/second, cosine similarity of
+              each vector to the fp32 vector (drift)
+  generator - p50/p95 latency per prompt, prompts/second, exact-match rate and
+              token F1 of answers against the fp32 answers (drift)
+
+Passages come from the PDFs under --data (same splitter as ingestion), or a
+small built-in set when there are none.
+
+    python -m benchmarks.inference_backends --backends fp32,int8,onnx --threads 4
+"""
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from Backend.Rag import inference_backend
+from Backend.Rag.model_registry import EMBED_MODEL, HF_LLM_MODEL
+from Backend.Rag.rag_chain import GEN_MAX_LENGTH
+
+FALLBACK_PASSAGES = [
+    "Quarterly revenue grew 12% year over year, driven by subscription renewals in EMEA.",
+    "Employees accrue 1.5 days of paid leave per month; unused leave carries over up to 10 days.",
+    "The marketing budget for Q3 is allocated 40% to digital campaigns and 25% to events.",
+    "All production deployments require a reviewed change request and a rollback plan.",
+    "Expense reports must be submitted within 30 days with itemised receipts attached.",
+    "The engineering on-call rotation is weekly and hands over every Monday at 10:00.",
+]
+QUESTION = "Answer the question using only the context.\n\nContext:\n{context}\n\nQuestion: What does this say?\nAnswer:"
+
+
+def _percentile(values, p):
+    return float(np.percentile(np.asarray(values), p)) if values else 0.0
+
+
+def _token_f1(a: str, b: str) -> float:
+    ta, tb = a.lower().split(), b.lower().split()
+    if not ta and not tb:
+        return 1.0
+    common = sum((Counter(ta) & Counter(tb)).values())
+    if not common:
+        return 0.0
+    precision, recall = common / len(ta), common / len(tb)
+    return 2 * precision * recall / (precision + recall)
+
+
+def load_passages(data_dir, limit):
+    try:
+        from Backend.Rag.loader import load_documents
+        docs = load_documents(data_dir)
+    except Exception:
+        docs = []
+    texts = [d.page_content for d in docs if d.page_content.strip()][:limit]
+    return texts or FALLBACK_PASSAGES
+
+
+def bench_embedder(backend, texts, batch_size, threads):
+    t0 = time.perf_counter()
+    model = inference_backend.build_embeddings(EMBED_MODEL, backend=backend, threads=threads)
+    load_seconds = time.perf_counter() - t0
+
+    model.embed_documents(texts[:batch_size])  # warm-up
+    latencies, vectors = [], []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        t0 = time.perf_counter()
+        vectors.extend(model.embed_documents(texts[i:i + batch_size]))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+
+    return np.asarray(vectors, dtype=np.float32), {
+        "load_seconds": round(load_seconds, 2),
+        "batch_p50_ms": round(_percentile(latencies, 50), 2),
+        "batch_p95_ms": round(_percentile(latencies, 95), 2),
+        "texts_per_second": round(len(texts) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def bench_generator(backend, prompts, threads):
+    t0 = time.perf_counter()
+    generator = inference_backend.build_generator(
+        HF_LLM_MODEL, backend=backend, threads=threads, do_sample=False
+    )
+    load_seconds = time.perf_counter() - t0
+
+    generator(prompts[0], max_length=GEN_MAX_LENGTH)  # warm-up
+    latencies, answers = [], []
+    start = time.perf_counter()
+    for prompt in prompts:
+        t0 = time.perf_counter()
+        out = generator(prompt, max_length=GEN_MAX_LENGTH)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        answers.append(out[0].get("generated_text", "") if out else "")
+    elapsed = time.perf_counter() - start
+
+    return answers, {
+        "load_seconds": round(load_seconds, 2),
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "prompts_per_second": round(len(prompts) / elapsed, 3) if elapsed > 0 else 0.0,
+    }
+
+
+def run(args):
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "fp32" not in backends:
+        backends.insert(0, "fp32")  # drift is measured against fp32
+
+    texts = load_passages(args.data, args.passages)
+    prompts = [QUESTION.format(context=t) for t in texts[: args.prompts]]
+    print(f"[BENCH] {len(texts)} passages, {len(prompts)} prompts, backends={backends}")
+
+    results = {}
+    base_vectors = base_answers = None
+    for backend in backends:
+        entry = {}
+        try:
+            vectors, entry["embedder"] = bench_embedder(backend, texts, args.batch_size, args.threads)
+            if base_vectors is None:
+                base_vectors = vectors
+            cos = np.sum(vectors * base_vectors, axis=1)  # both normalized
+            entry["embedder"]["cosine_to_fp32_mean"] = round(float(cos.mean()), 5)
+            entry["embedder"]["cosine_to_fp32_min"] = round(float(cos.min()), 5)
+        except Exception as e:
+            entry["embedder"] = {"error": repr(e)}
+
+        if not args.skip_generator:
+            try:
+                answers, entry["generator"] = bench_generator(backend, prompts, args.threads)
+                if base_answers is None:
+                    base_answers = answers
+                entry["generator"]["exact_match_to_fp32"] = round(
+                    float(np.mean([a == b for a, b in zip(answers, base_answers)])), 4
+                )
+                entry["generator"]["token_f1_to_fp32"] = round(
+                    float(np.mean([_token_f1(a, b) for a, b in zip(answers, base_answers)])), 4
+                )
+            except Exception as e:
+                entry["generator"] = {"error": repr(e)}
+
+        results[backend] = entry
+        print(f"[BENCH] {backend}: {json.dumps(entry)}")
+
+    report = {
+        "embed_model": EMBED_MODEL,
+        "llm_model": HF_LLM_MODEL,
+        "threads": args.threads,
+        "passages": len(texts),
+        "prompts": len(prompts),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="fp32,int8,onnx")
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads per stage (0 = default)")
+    parser.add_argument("--data", default="./data")
+    parser.add_argument("--passages", type=int, default=256)
+    parser.add_argument("--prompts", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--skip-generator", action="store_true")
+    parser.add_argument("--output", help="write the JSON report here")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,141 @@
+# benchmarks/partitioned_vs_filtered.py
+"""
+Compares role isolation strategies on a synthetic corpus:
+
+  filtered    - one collection, `where={"role": label}` at query time
+  partitioned - one collection per role label, unfiltered query
+
+Reports p50/p95/p99 latency and recall@k against exact brute-force search
+inside the role's slice.
+
+    python -m benchmarks.partitioned_vs_filtered --chunks 1000000 --queries 200
+"""
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+import chromadb
+
+# skewed label sizes, roughly like a real company share (General is large, Management small)
+LABELS = {
+    "General": 0.40,
+    "Finance": 0.20,
+    "Marketing": 0.15,
+    "Engineering": 0.15,
+    "HR": 0.07,
+    "Management": 0.03,
+}
+
+
+def _percentile(values, p):
+    return float(np.percentile(np.asarray(values), p)) if values else 0.0
+
+
+def _normalize(x):
+    return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+
+def build_corpus(n, dim, seed):
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(list(LABELS), size=n, p=list(LABELS.values()))
+    vectors = _normalize(rng.standard_normal((n, dim)).astype(np.float32))
+    return labels, vectors
+
+
+def _add(collection, ids, vectors, metadatas, batch):
+    for i in range(0, len(ids), batch):
+        collection.add(
+            ids=ids[i:i + batch],
+            embeddings=vectors[i:i + batch].tolist(),
+            metadatas=metadatas[i:i + batch] if metadatas else None,
+        )
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="rag_partition_bench_")
+    try:
+        client = chromadb.PersistentClient(path=workdir)
+        batch = client.get_max_batch_size() if hasattr(client, "get_max_batch_size") else 5000
+        space = {"hnsw:space": "cosine"}
+
+        print(f"[BENCH] Building {args.chunks} chunks (dim={args.dim})")
+        labels, vectors = build_corpus(args.chunks, args.dim, args.seed)
+        ids = [f"c{i}" for i in range(args.chunks)]
+
+        t0 = time.perf_counter()
+        shared = client.create_collection("bench_shared", metadata=space)
+        _add(shared, ids, vectors, [{"role": str(l)} for l in labels], batch)
+        shared_build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        partitions = {}
+        for label in LABELS:
+            mask = labels == label
+            part = client.create_collection(f"bench_{label.lower()}", metadata=space)
+            _add(part, [ids[i] for i in np.flatnonzero(mask)], vectors[mask], None, batch)
+            partitions[label] = part
+        partitioned_build = time.perf_counter() - t0
+
+        rng = np.random.default_rng(args.seed + 1)
+        queries = _normalize(rng.standard_normal((args.queries, args.dim)).astype(np.float32))
+        query_labels = rng.choice(list(LABELS), size=args.queries)
+
+        results = {}
+        for mode in ("filtered", "partitioned"):
+            latencies, recalls = [], []
+            for q, label in zip(queries, query_labels):
+                mask = labels == label
+                slice_ids = np.flatnonzero(mask)
+                truth = set(ids[i] for i in slice_ids[np.argsort(-(vectors[mask] @ q))[: args.k]])
+
+                t0 = time.perf_counter()
+                if mode == "filtered":
+                    res = shared.query(query_embeddings=[q.tolist()], n_results=args.k, where={"role": str(label)})
+                else:
+                    res = partitions[label].query(query_embeddings=[q.tolist()], n_results=args.k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+                got = set(res["ids"][0])
+                recalls.append(len(got & truth) / max(1, len(truth)))
+
+            results[mode] = {
+                "p50_ms": round(_percentile(latencies, 50), 3),
+                "p95_ms": round(_percentile(latencies, 95), 3),
+                "p99_ms": round(_percentile(latencies, 99), 3),
+                f"recall@{args.k}": round(float(np.mean(recalls)), 4),
+            }
+
+        report = {
+            "chunks": args.chunks,
+            "dim": args.dim,
+            "queries": args.queries,
+            "k": args.k,
+            "build_seconds": {"filtered": round(shared_build, 2), "partitioned": round(partitioned_build, 2)},
+            "results": results,
+        }
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=384)  # all-MiniLM-L6-v2
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
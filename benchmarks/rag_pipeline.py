@@ -0,0 +1,429 @@
+# benchmarks/rag_pipeline.py
+"""
+Offline end-to-end benchmark of the RAG request path.
+
+Builds a synthetic multi-role corpus of PDFs in data/-style folders, runs
+rag_ingest over it, then replays a seeded question workload through
+RAGChain. Lightweight stand-in models replace MiniLM and flan-t5 so it runs
+offline on CPU, and everything else (loader, splitter, embedding stage,
+Chroma, BM25, prompt budgeting, micro-batching) is the real code:
+
+  embedder  - feature hashing of tokens into a normalized 384-d vector
+  generator - extractive: echoes the start of the context, sleeping
+              --gen-ms per prompt to stand in for decoder cost
+
+Reports ingest throughput, per-stage latency (embed / retrieve / prompt /
+generate), end-to-end QPS at each --concurrency level and peak memory as
+JSON. Compare two runs to catch regressions:
+
+    python -m benchmarks.rag_pipeline --output bench.json
+    python -m benchmarks.rag_pipeline --compare bench.json --tolerance 0.15
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# folder name -> loader.normalize_role() label
+ROLE_FOLDERS = {
+    "finance docs": "Finance",
+    "Marketing docs": "Marketing",
+    "employee data": "Employee",
+    "management docs": "Management",
+    "general": "General",
+}
+
+TOPICS = {
+    "Finance": ["revenue", "invoice", "budget", "forecast", "audit", "margin", "expense", "cashflow", "ledger", "tax"],
+    "Marketing": ["campaign", "brand", "funnel", "conversion", "audience", "launch", "channel", "engagement", "lead", "seo"],
+    "Employee": ["leave", "payroll", "benefits", "onboarding", "holiday", "insurance", "training", "appraisal", "policy", "remote"],
+    "Management": ["strategy", "board", "acquisition", "headcount", "roadmap", "risk", "investor", "quarterly", "target", "okr"],
+    "General": ["office", "security", "travel", "equipment", "wifi", "cafeteria", "parking", "badge", "visitor", "helpdesk"],
+}
+FILLER = ("the team reported that our plan for the period covers this area and the numbers were "
+          "reviewed by the owners with a follow up due next month according to the handbook").split()
+
+EMBED_DIM = 384
+_TOKEN_RE = re.compile(r"\w+")
+
+# numbers in the report where lower is better (a rise beyond tolerance is a regression)
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "seconds", "peak_rss_mb")
+HIGHER_IS_BETTER = ("chunks_per_second", "files_per_second", "qps")
+
+
+# -----------------------------
+# Stand-in models
+# -----------------------------
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words feature hashing; a CPU-cheap MiniLM stand-in."""
+
+    def __init__(self, dim: int = EMBED_DIM):
+        self.dim = dim
+
+    def _embed(self, text: str):
+        v = np.zeros(self.dim, dtype=np.float32)
+        for tok in _TOKEN_RE.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=8).digest(), "little")
+            v[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        n = np.linalg.norm(v)
+        return (v / n if n else v).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class WhitespaceTokenizer:
+    """Just enough of the HF tokenizer interface for context_builder.TokenCounter."""
+
+    def __call__(self, text, add_special_tokens=False, **kwargs):
+        return {"input_ids": text.split()}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(ids)
+
+
+class ExtractiveGenerator:
+    """text2text-generation pipeline stand-in with a fixed per-prompt cost."""
+
+    def __init__(self, gen_ms: float, answer_words: int = 40):
+        self.gen_seconds = gen_ms / 1000.0
+        self.answer_words = answer_words
+        self.tokenizer = WhitespaceTokenizer()
+        self.model = None  # no streaming in this benchmark
+
+    def _answer(self, prompt: str) -> str:
+        context = prompt.split("Context:", 1)[-1]
+        return " ".join(context.split()[: self.answer_words])
+
+    def __call__(self, prompts, **kwargs):
+        single = isinstance(prompts, str)
+        batch = [prompts] if single else list(prompts)
+        # padded batches cost roughly one forward pass per prompt on CPU
+        time.sleep(self.gen_seconds * len(batch))
+        outputs = [[{"generated_text": self._answer(p)}] for p in batch]
+        return outputs[0] if single else outputs
+
+
+# -----------------------------
+# Synthetic corpus
+# -----------------------------
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages):
+    """Minimal PDF writer: one Helvetica text block per page (pages = list of line lists)."""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in below
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 790 Td " + " ".join(f"({_pdf_escape(l)}) Tj T*" for l in lines) + " ET"
+        data = stream.encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    objects[pages_obj - 1] = (
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def _sentence(rng, role: str, doc_no: int, line_no: int) -> str:
+    topic = TOPICS[role]
+    words = [topic[i] for i in rng.integers(0, len(topic), size=3)]
+    filler = [FILLER[i] for i in rng.integers(0, len(FILLER), size=8)]
+    code = f"{role[:3].upper()}-{doc_no:03d}-{line_no:04d}"
+    amount = int(rng.integers(100, 100_000))
+    return f"{code} {words[0]} {' '.join(filler[:4])} {words[1]} {amount} {' '.join(filler[4:])} {words[2]}."
+
+
+def build_corpus(data_dir: str, files_per_role: int, pages_per_file: int, lines_per_page: int, seed: int):
+    """Writes the PDFs and returns sample sentences per role to draw questions from."""
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for folder, role in ROLE_FOLDERS.items():
+        os.makedirs(os.path.join(data_dir, folder), exist_ok=True)
+        for doc_no in range(files_per_role):
+            pages = []
+            for page_no in range(pages_per_file):
+                lines = [_sentence(rng, role, doc_no, page_no * lines_per_page + i) for i in range(lines_per_page)]
+                pages.append(lines)
+                samples.setdefault(role, []).append(lines[int(rng.integers(0, len(lines)))])
+            write_pdf(os.path.join(data_dir, folder, f"{role.lower()}_{doc_no:03d}.pdf"), pages)
+    return samples
+
+
+def build_workload(samples, roles, n: int, repeat_ratio: float, seed: int):
+    """(role, question) pairs; a share of questions repeat earlier ones, as real traffic does."""
+    rng = np.random.default_rng(seed + 1)
+    workload = []
+    for _ in range(n):
+        if workload and rng.random() < repeat_ratio:
+            workload.append(workload[int(rng.integers(0, len(workload)))])
+            continue
+        role = roles[int(rng.integers(0, len(roles)))]
+        label = ROLE_FOLDERS[list(ROLE_FOLDERS)[int(rng.integers(0, len(ROLE_FOLDERS)))]]
+        sentence = samples[label][int(rng.integers(0, len(samples[label])))]
+        words = sentence.rstrip(".").split()
+        question = "What does " + " ".join(words[:2] + words[-3:]) + " say?"
+        workload.append((role, question))
+    return workload
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _percentiles(values_ms) -> dict:
+    if not values_ms:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    arr = np.asarray(values_ms)
+    return {f"p{p}_ms": round(float(np.percentile(arr, p)), 3) for p in (50, 95, 99)}
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, KB on Linux
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def _configure_env(workdir: str, args):
+    # must happen before Backend modules are imported: they read config at import time
+    os.environ["CHROMA_PERSIST_DIR"] = os.path.join(workdir, "chroma")
+    os.environ["RAG_LEXICAL_DIR"] = os.path.join(workdir, "chroma", "lexical_index")
+    os.environ["EMBED_CACHE_PATH"] = os.path.join(workdir, "embedding_cache.sqlite")
+    # role grants come from the RBAC database; keep the repo's rbac.db untouched
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "rbac.db")
+    os.environ["RAG_ANSWER_CACHE"] = "true" if args.answer_cache else "false"
+    os.environ["RAG_RERANK"] = "false"
+    if args.layout:
+        os.environ["RAG_INDEX_LAYOUT"] = args.layout
+    if args.ingest_workers:
+        os.environ["INGEST_WORKERS"] = str(args.ingest_workers)
+
+
+# -----------------------------
+# Run
+# -----------------------------
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="rag_bench_")
+    try:
+        _configure_env(workdir, args)
+        from Backend.Rag import rag_ingest
+        from Backend.Rag.model_registry import get_registry
+        from Backend.Rag.rag_chain import run_rag_query, get_rag_chain
+        from Backend.Database.connections import Base, engine, SessionLocal
+        from Backend.auth.permission_matrix import seed_role_grants
+
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            seed_role_grants(db)
+
+        data_dir = os.path.join(workdir, "data")
+        t0 = time.perf_counter()
+        samples = build_corpus(data_dir, args.files_per_role, args.pages, args.lines, args.seed)
+        corpus_seconds = time.perf_counter() - t0
+        n_files = args.files_per_role * len(ROLE_FOLDERS)
+        print(f"[BENCH] Corpus: {n_files} PDFs in {corpus_seconds:.2f}s")
+
+        embeddings = HashingEmbeddings()
+        t0 = time.perf_counter()
+        ingest_stats = rag_ingest.ingest_documents(data_dir, embeddings=embeddings) or {}
+        ingest_seconds = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        rag_ingest.ingest_documents(data_dir, embeddings=embeddings)
+        noop_seconds = time.perf_counter() - t0
+
+        registry = get_registry()
+        registry.override(embeddings=embeddings, llm_pipeline=ExtractiveGenerator(args.gen_ms))
+
+        roles = [r.strip() for r in args.roles.split(",") if r.strip()]
+        workload = build_workload(samples, roles, args.questions, args.repeat_ratio, args.seed)
+        for role in roles:
+            get_rag_chain(role)  # chain construction is not part of the request path
+
+        # sequential pass: per-stage latency without queueing effects
+        stage_ms = {}
+        e2e_ms = []
+        for role, question in workload:
+            t0 = time.perf_counter()
+            result = run_rag_query(role, question)
+            e2e_ms.append((time.perf_counter() - t0) * 1000)
+            for stage, seconds in result["timings"].items():
+                stage_ms.setdefault(stage, []).append(seconds * 1000)
+
+        # concurrent passes: throughput through the real micro-batchers
+        concurrency = {}
+        for level in args.concurrency_levels:
+            latencies = []
+
+            def one(item):
+                t = time.perf_counter()
+                run_rag_query(*item)
+                latencies.append((time.perf_counter() - t) * 1000)
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=level) as pool:
+                list(pool.map(one, workload))
+            elapsed = time.perf_counter() - t0
+            concurrency[str(level)] = {
+                "qps": round(len(workload) / elapsed, 2),
+                **_percentiles(latencies),
+            }
+            print(f"[BENCH] concurrency={level}: {concurrency[str(level)]}")
+
+        report = {
+            "benchmark": "rag_pipeline",
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "params": {
+                k: getattr(args, k)
+                for k in ("files_per_role", "pages", "lines", "questions", "repeat_ratio",
+                          "gen_ms", "seed", "roles", "answer_cache", "layout")
+            },
+            "ingest": {
+                "files": n_files,
+                "chunks": ingest_stats.get("chunks", 0),
+                "seconds": round(ingest_seconds, 3),
+                "files_per_second": round(n_files / ingest_seconds, 2) if ingest_seconds else 0.0,
+                "chunks_per_second": round(ingest_stats.get("chunks", 0) / ingest_seconds, 2) if ingest_seconds else 0.0,
+                "embed_seconds": ingest_stats.get("embed_seconds"),
+                "write_seconds": ingest_stats.get("write_seconds"),
+                "noop_rerun_seconds": round(noop_seconds, 3),
+            },
+            "stages": {stage: _percentiles(values) for stage, values in sorted(stage_ms.items())},
+            "end_to_end": _percentiles(e2e_ms),
+            "concurrency": concurrency,
+            "peak_rss_mb": _peak_rss_mb(),
+        }
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# -----------------------------
+# Compare
+# -----------------------------
+def _flatten(obj, prefix=""):
+    out = {}
+    for k, v in obj.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def compare(baseline: dict, current: dict, tolerance: float):
+    """Returns [(metric, baseline, current, relative change)] for metrics that got worse than tolerance."""
+    base, cur = _flatten(baseline), _flatten(current)
+    regressions = []
+    for key, old in base.items():
+        new = cur.get(key)
+        if new is None or key.startswith("params.") or old <= 0:
+            continue
+        leaf = key.rsplit(".", 1)[-1]
+        change = (new - old) / old
+        if leaf in HIGHER_IS_BETTER or leaf.endswith("_per_second"):
+            worse = change < -tolerance
+        elif leaf in LOWER_IS_BETTER or leaf.endswith("_ms") or leaf.endswith("seconds"):
+            worse = change > tolerance
+        else:
+            continue
+        if worse:
+            regressions.append((key, old, new, round(change, 4)))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files-per-role", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=4, help="pages per PDF")
+    parser.add_argument("--lines", type=int, default=40, help="lines per page")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--repeat-ratio", type=float, default=0.2)
+    parser.add_argument("--roles", default="Finance,Marketing,Employee,C_Level")
+    parser.add_argument("--concurrency", default="1,4,8", help="comma-separated client counts")
+    parser.add_argument("--gen-ms", type=float, default=20.0, help="simulated generation cost per prompt")
+    parser.add_argument("--answer-cache", action="store_true", help="leave the semantic answer cache on")
+    parser.add_argument("--layout", choices=("shared", "partitioned"))
+    parser.add_argument("--ingest-workers", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+    args.concurrency_levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    report = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != report["params"]:
+            print("[BENCH] WARNING: baseline was run with different params; numbers are not comparable")
+        regressions = compare(baseline, report, args.tolerance)
+        for key, old, new, change in regressions:
+            print(f"[BENCH] REGRESSION {key}: {old} -> {new} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"[BENCH] No regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,157 @@
+# benchmarks/rbac_bulk.py
+"""
+Provisions --roles x --permissions role/permission links (10k by default)
+through the roles/permissions API on a throwaway SQLite database, once per
+item and once through the bulk endpoints, and reports wall time, HTTP
+requests and links/second for each:
+
+  per_item - POST /roles/, POST /permissions/, POST /permissions/assign/{r}/{p}
+  bulk     - POST /roles/bulk, POST /permissions/bulk, POST /permissions/assign/bulk
+             in batches of --batch links
+
+Requests go through FastAPI's TestClient, so the numbers cover routing,
+validation, SQL and the permission matrix refresh but not network latency
+(which only widens the gap). Both runs finish with a full keyset-paginated
+listing and a check that the database holds every link.
+
+    python -m benchmarks.rbac_bulk --roles 100 --permissions 100 --batch 2000
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+
+def _provision_per_item(client, args) -> int:
+    requests = 0
+    role_ids, permission_ids = [], []
+    for i in range(args.roles):
+        role_ids.append(client.post("/roles/", json={"name": f"role{i:05d}"}).json()["id"])
+        requests += 1
+    for j in range(args.permissions):
+        permission_ids.append(client.post("/permissions/", json={"name": f"perm{j:05d}"}).json()["id"])
+        requests += 1
+    for r in role_ids:
+        for p in permission_ids:
+            resp = client.post(f"/permissions/assign/{r}/{p}")
+            assert resp.status_code == 200, resp.text
+            requests += 1
+    return requests
+
+
+def _provision_bulk(client, args) -> int:
+    roles = client.post("/roles/bulk", json={"names": [f"role{i:05d}" for i in range(args.roles)]}).json()
+    perms = client.post("/permissions/bulk", json={"names": [f"perm{j:05d}" for j in range(args.permissions)]}).json()
+    requests = 2
+    links = [{"role_id": r["id"], "permission_id": p["id"]} for r in roles for p in perms]
+    for i in range(0, len(links), args.batch):
+        resp = client.post("/permissions/assign/bulk", json={"links": links[i:i + args.batch]})
+        assert resp.status_code == 200, resp.text
+        requests += 1
+    return requests
+
+
+def _list_all(client, path: str, limit: int) -> tuple:
+    items, pages, after = 0, 0, None
+    while True:
+        params = {"limit": limit} if after is None else {"limit": limit, "after": after}
+        resp = client.get(path, params=params)
+        items += len(resp.json())
+        pages += 1
+        after = resp.headers.get("X-Next-Cursor")
+        if after is None:
+            return items, pages
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="rbac_bulk_bench_")
+    try:
+        # before any Backend import: connections.py reads it at import time
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+        os.environ.setdefault("RBAC_BULK_MAX", str(max(args.batch, args.roles, args.permissions)))
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from sqlalchemy import delete, func, select
+        from Backend.Database.connections import Base, engine, SessionLocal
+        from Backend.Database import models
+        from Backend.auth.permission_matrix import get_permission_matrix
+        from Backend.roles.routes import router as role_router
+        from Backend.permissions.routes import router as permission_router
+
+        Base.metadata.create_all(bind=engine)
+        models.ensure_indexes(engine)
+        app = FastAPI()
+        app.include_router(role_router)
+        app.include_router(permission_router)
+        client = TestClient(app)
+        expected = args.roles * args.permissions
+
+        results = {}
+        for mode, provision in (("per_item", _provision_per_item), ("bulk", _provision_bulk)):
+            with SessionLocal() as db:
+                for table in (models.role_permission, models.Role.__table__, models.Permission.__table__):
+                    db.execute(delete(table))
+                db.commit()
+            get_permission_matrix().load()
+
+            t0 = time.perf_counter()
+            requests = provision(client, args)
+            seconds = time.perf_counter() - t0
+
+            t1 = time.perf_counter()
+            listed_roles, role_pages = _list_all(client, "/roles/", args.page_size)
+            listed_perms, perm_pages = _list_all(client, "/permissions/", args.page_size)
+            list_seconds = time.perf_counter() - t1
+
+            with SessionLocal() as db:
+                links = db.execute(select(func.count()).select_from(models.role_permission)).scalar_one()
+            assert links == expected, (mode, links, expected)
+            assert get_permission_matrix().stats()["links"] == expected
+            results[mode] = {
+                "links": links,
+                "requests": requests,
+                "seconds": round(seconds, 3),
+                "links_per_second": round(links / seconds, 1) if seconds else 0.0,
+                "listing": {
+                    "roles": listed_roles,
+                    "permissions": listed_perms,
+                    "pages": role_pages + perm_pages,
+                    "seconds": round(list_seconds, 4),
+                },
+            }
+            print(f"[BENCH] {mode}: {json.dumps(results[mode])}")
+
+        per_item, bulk = results["per_item"]["seconds"], results["bulk"]["seconds"]
+        report = {
+            "roles": args.roles,
+            "permissions": args.permissions,
+            "links": expected,
+            "batch": args.batch,
+            "database": "sqlite (WAL)",
+            "results": results,
+            "speedup": round(per_item / bulk, 1) if bulk else None,
+        }
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roles", type=int, default=100)
+    parser.add_argument("--permissions", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=2000, help="links per bulk assign request")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--output", help="write the JSON report here")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
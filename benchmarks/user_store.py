@@ -0,0 +1,151 @@
+# benchmarks/user_store.py
+"""
+Compares the SQL-backed user store (Backend/auth/user_store.py) with the
+old module-level dict on a throwaway SQLite database:
+
+  login   - p50/p95/p99 of user lookup (+ password verify with --with-hashing)
+  signup  - users created per second with --threads concurrent clients
+
+Password hashing is precomputed by default so the numbers show the store
+itself; argon2 otherwise dominates both sides equally.
+
+    python -m benchmarks.user_store --users 2000 --logins 2000 --threads 8
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def _percentiles(values_ms) -> dict:
+    arr = np.asarray(values_ms) if values_ms else np.zeros(1)
+    return {f"p{p}_ms": round(float(np.percentile(arr, p)), 4) for p in (50, 95, 99)}
+
+
+class DictStore:
+    """The previous auth store: a process-local dict of InnerDB records."""
+
+    def __init__(self):
+        from Backend.Model.user_model import InnerDB
+        self._model = InnerDB
+        self._users = {}
+
+    def signup(self, username, hashed, role):
+        if username in self._users:
+            return False
+        self._users[username] = self._model(username=username, hashed_password=hashed, role=role)
+        return True
+
+    def lookup(self, username):
+        user = self._users.get(username)
+        return (user.hashed_password, user.role) if user else None
+
+
+class SqlStore:
+    def __init__(self):
+        from Backend.Database.connections import SessionLocal
+        from Backend.auth import user_store
+        self._sessions = SessionLocal
+        self._store = user_store
+
+    def signup(self, username, hashed, role):
+        with self._sessions() as db:
+            try:
+                self._store.create_user(db, username, hashed, role)
+                return True
+            except self._store.UserExists:
+                return False
+
+    def lookup(self, username):
+        with self._sessions() as db:
+            user = self._store.get_user(db, username)
+            return (user.password, self._store.primary_role(user)) if user else None
+
+
+def bench_store(store, args, roles, hashed, verify):
+    # concurrent signup throughput
+    names = [f"user{i:06d}" for i in range(args.users)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        created = sum(pool.map(lambda i: store.signup(names[i], hashed, roles[i % len(roles)]), range(args.users)))
+    signup_seconds = time.perf_counter() - t0
+
+    # sequential login latency over random existing users
+    rng = np.random.default_rng(args.seed)
+    latencies = []
+    for i in rng.integers(0, args.users, size=args.logins):
+        t = time.perf_counter()
+        found = store.lookup(names[i])
+        if verify is not None and found:
+            verify(args.password, found[0])
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    return {
+        "signup": {
+            "users": created,
+            "threads": args.threads,
+            "seconds": round(signup_seconds, 3),
+            "users_per_second": round(created / signup_seconds, 1) if signup_seconds else 0.0,
+        },
+        "login": {"logins": args.logins, **_percentiles(latencies)},
+    }
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="user_store_bench_")
+    try:
+        # before any Backend import: connections.py reads it at import time
+        os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+        from Backend.Database.connections import Base, engine
+        from Backend.Database import models
+        from Backend.auth.auth_handler import get_password_hash, verify_password
+
+        Base.metadata.create_all(bind=engine)
+        models.ensure_indexes(engine)
+
+        hashed = get_password_hash(args.password)
+        verify = verify_password if args.with_hashing else None
+        roles = ["Finance", "Marketing", "HR", "Engineering", "C_Level", "Employee"]
+
+        results = {}
+        for name, store in (("dict", DictStore()), ("sql", SqlStore())):
+            results[name] = bench_store(store, args, roles, hashed, verify)
+            print(f"[BENCH] {name}: {json.dumps(results[name])}")
+
+        report = {
+            "users": args.users,
+            "logins": args.logins,
+            "threads": args.threads,
+            "with_hashing": args.with_hashing,
+            "database": "sqlite (WAL)",
+            "results": results,
+        }
+        print(json.dumps(report, indent=2))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--logins", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--password", default="correct horse battery staple")
+    parser.add_argument("--with-hashing", action="store_true", help="include argon2 verify in login latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,48 @@
+# tests/test_permission_matrix.py
+from Backend.auth.permission_matrix import DEFAULT_ROLES, PermissionMatrix, _config_rows
+
+
+def _config_matrix():
+    matrix = PermissionMatrix(refresh=0)
+    matrix._install(*_config_rows(DEFAULT_ROLES), source="config")
+    return matrix
+
+
+def test_config_fallback_compiles_roles_by_name():
+    matrix = _config_matrix()
+    finance = matrix.role("Finance")
+    assert finance.id is not None
+    assert list(finance.documents) == ["finance_docs", "general_docs"]
+    assert finance.search_filter == {"role": {"$in": ["Finance", "General", "Employee"]}}
+    assert matrix.has_permission("Finance", "finance_docs")
+    assert not matrix.has_permission("Finance", "hr_docs")
+
+
+def test_config_fallback_c_level_sees_every_collection():
+    matrix = _config_matrix()
+    assert set(matrix.role("C_Level").documents) == set(DEFAULT_ROLES["C_Level"])
+    assert "Management" in matrix.role("C_Level").labels
+
+
+def test_allowed_docs_reads_the_config_fallback(monkeypatch):
+    from Backend.auth import permission_matrix, role_assigner
+    monkeypatch.setattr(permission_matrix, "_matrix", _config_matrix())
+    assert role_assigner.allowed_docs("Finance") == ["finance_docs", "general_docs"]
+    assert role_assigner.retrieval_filter("Employee") == {"role": {"$in": ["General", "Employee"]}}
+
+
+def test_load_read_before_a_revoke_does_not_resurrect_it():
+    rows = ([(1, "Finance")], [(1, "finance_docs")], [(1, 1)])
+    matrix = PermissionMatrix(refresh=0)
+    matrix._install(*rows, source="database")
+
+    # a periodic load queries the database before the revoke commits ...
+    with matrix._lock:
+        matrix._sequence += 1
+        sequence = matrix._sequence
+    matrix.unassigned(1, 1)
+    # ... and installs its snapshot after the incremental update
+    matrix._install(*rows, source="database", sequence=sequence)
+
+    assert not matrix.has_permission("Finance", "finance_docs")
+    assert matrix.stale_loads == 1